@@ -1,6 +1,5 @@
 """Module for separating audio sources using MDX architecture models."""
 
-import os
 import platform
 import torch
 import onnx
@@ -113,15 +112,21 @@ class MDXSeparator(CommonSeparator):
         self.logger.debug("Loading ONNX model for inference...")
 
         if self.segment_size == self.dim_t:
-            ort_session_options = ort.SessionOptions()
+            # Use the caller-provided session options (e.g. thread and graph optimization tuning) if any
+            ort_session_options = self.onnx_session_options if self.onnx_session_options is not None else ort.SessionOptions()
             if self.log_level > 10:
                 ort_session_options.log_severity_level = 3
             else:
                 ort_session_options.log_severity_level = 0
 
             ort_inference_session = ort.InferenceSession(self.model_path, providers=self.onnx_execution_provider, sess_options=ort_session_options)
-            self.model_run = lambda spek: ort_inference_session.run(None, {"input": spek.cpu().numpy()})[0]
-            self.logger.debug("Model loaded successfully using ONNXruntime inferencing session.")
+            if self.torch_device.type == "cuda" and "CUDAExecutionProvider" in ort_inference_session.get_providers():
+                # Bind the CUDA spectrogram tensors directly, avoiding a device -> host -> device round trip per batch
+                self.model_run = lambda spek: self.run_onnx_with_io_binding(ort_inference_session, spek)
+                self.logger.debug("Model loaded successfully using ONNXruntime inferencing session with CUDA IO binding.")
+            else:
+                self.model_run = lambda spek: ort_inference_session.run(None, {"input": spek.cpu().numpy()})[0]
+                self.logger.debug("Model loaded successfully using ONNXruntime inferencing session.")
         else:
             if platform.system() == 'Windows':
                 onnx_model = onnx.load(self.model_path)
@@ -132,6 +137,25 @@ class MDXSeparator(CommonSeparator):
             self.model_run.to(self.torch_device).eval()
             self.logger.warning("Model converted from onnx to pytorch due to segment size not matching dim_t, processing may be slower.")
 
+    def run_onnx_with_io_binding(self, ort_inference_session, spek):
+        """
+        Runs the ONNX model on a CUDA spectrogram tensor using IO binding, so the input is read from and the output is
+        written to GPU memory owned by torch. MDX models output a spectrogram of the same shape as their input.
+        """
+        spek = spek.contiguous().float()
+        spec_pred = torch.empty_like(spek)
+        device_id = spek.device.index or 0
+
+        # ONNXruntime runs on its own CUDA stream, so make sure torch has finished writing the input first
+        torch.cuda.current_stream(spek.device).synchronize()
+
+        io_binding = ort_inference_session.io_binding()
+        io_binding.bind_input("input", "cuda", device_id, np.float32, tuple(spek.shape), spek.data_ptr())
+        io_binding.bind_output(ort_inference_session.get_outputs()[0].name, "cuda", device_id, np.float32, tuple(spec_pred.shape), spec_pred.data_ptr())
+        ort_inference_session.run_with_iobinding(io_binding)
+
+        return spec_pred
+
     def separate(self, audio_file_path, custom_output_names=None):
         """
         Separates the audio file into primary and secondary sources based on the model's configuration.
@@ -145,7 +169,7 @@ class MDXSeparator(CommonSeparator):
             list: A list of paths to the output files generated by the separation process.
         """
         self.audio_file_path = audio_file_path
-        self.audio_file_base = os.path.splitext(os.path.basename(audio_file_path))[0]
+        self.audio_file_base = self.get_audio_file_base(audio_file_path)
 
         # Prepare the mix for processing
         self.logger.debug(f"Preparing mix for input audio file {self.audio_file_path}...")
@@ -293,7 +317,9 @@ class MDXSeparator(CommonSeparator):
         processing it in chunks, applying windowing for overlaps, and accumulating the results to separate the sources.
         """
         self.logger.debug(f"Starting demixing process with is_match_mix: {is_match_mix}...")
-        self.initialize_model_settings()
+        # The model settings (and STFT) only depend on the model, so they are set up once and reused for every file
+        if self.stft is None:
+            self.initialize_model_settings()
 
         # Preserves the original mix for later use.
         # In UVR, this is used for the pitch fix and VR denoise processes, which aren't yet implemented here.
@@ -335,57 +361,49 @@ class MDXSeparator(CommonSeparator):
         result = np.zeros((1, 2, mixture.shape[-1]), dtype=np.float32)
         divider = np.zeros((1, 2, mixture.shape[-1]), dtype=np.float32)
 
-        # Initializes counters for processing chunks.
-        total = 0
-        total_chunks = (mixture.shape[-1] + step - 1) // step
-        self.logger.debug(f"Total chunks to process: {total_chunks}")
-
-        # Processes each chunk of the mixture.
-        for i in tqdm(range(0, mixture.shape[-1], step)):
-            total += 1
-            start = i
-            end = min(i + chunk_size, mixture.shape[-1])
-            self.logger.debug(f"Processing chunk {total}/{total_chunks}: Start {start}, End {end}")
-
-            # Handles windowing for overlapping chunks.
-            chunk_size_actual = end - start
-            window = None
-            if overlap != 0:
-                window = np.hanning(chunk_size_actual)
-                window = np.tile(window[None, None, :], (1, 2, 1))
-                self.logger.debug("Window applied to the chunk.")
-
-            # Zero-pad the chunk to prepare it for processing.
-            mix_part_ = mixture[:, start:end]
-            if end != i + chunk_size:
-                pad_size = (i + chunk_size) - end
-                mix_part_ = np.concatenate((mix_part_, np.zeros((2, pad_size), dtype="float32")), axis=-1)
-
-            # Converts the chunk to a tensor for processing.
-            mix_part = torch.tensor([mix_part_], dtype=torch.float32).to(self.torch_device)
-            # Splits the chunk into smaller batches if necessary.
-            mix_waves = mix_part.split(self.batch_size)
-            total_batches = len(mix_waves)
-            self.logger.debug(f"Mix part split into batches. Number of batches: {total_batches}")
+        # Collects the start of every chunk first, so that the chunks can be run through the model batch_size at a time.
+        chunk_starts = list(range(0, mixture.shape[-1], step))
 
-            with torch.no_grad():
-                # Processes each batch in the chunk.
-                batches_processed = 0
-                for mix_wave in mix_waves:
-                    batches_processed += 1
-                    self.logger.debug(f"Processing mix_wave batch {batches_processed}/{total_batches}")
+        # Overlap windows by chunk length; all chunks but the last have the same length, so only a couple are ever built.
+        windows = {}
+        total_chunks = len(chunk_starts)
+        self.logger.debug(f"Total chunks to process: {total_chunks}, in batches of {self.batch_size}")
 
-                    # Runs the model to separate the sources.
-                    tar_waves = self.run_model(mix_wave, is_match_mix=is_match_mix)
+        # Processes the chunks of the mixture in batches.
+        for batch_index in tqdm(range(0, total_chunks, self.batch_size)):
+            batch_chunk_starts = chunk_starts[batch_index : batch_index + self.batch_size]
+            self.logger.debug(f"Processing chunks {batch_index + 1}-{batch_index + len(batch_chunk_starts)}/{total_chunks}")
 
-                    # Applies windowing if needed and accumulates the results.
-                    if window is not None:
-                        tar_waves[..., :chunk_size_actual] *= window
-                        divider[..., start:end] += window
-                    else:
-                        divider[..., start:end] += 1
+            # Zero-pad each chunk to the full chunk size, so the chunks can be stacked into a single batch.
+            mix_parts = []
+            for start in batch_chunk_starts:
+                end = min(start + chunk_size, mixture.shape[-1])
+                mix_part_ = mixture[:, start:end]
+                if end != start + chunk_size:
+                    pad_size = (start + chunk_size) - end
+                    mix_part_ = np.concatenate((mix_part_, np.zeros((2, pad_size), dtype="float32")), axis=-1)
+                mix_parts.append(mix_part_)
 
-                    result[..., start:end] += tar_waves[..., : end - start]
+            # Converts the batch of chunks to a tensor for processing.
+            mix_wave = torch.tensor(np.stack(mix_parts), dtype=torch.float32).to(self.torch_device)
+
+            with torch.no_grad():
+                # Runs the model to separate the sources for every chunk in the batch at once.
+                tar_waves = self.run_model(mix_wave, is_match_mix=is_match_mix)
+
+            # Applies windowing if needed and accumulates the results of each chunk.
+            for tar_wave, start in zip(tar_waves, batch_chunk_starts):
+                end = min(start + chunk_size, mixture.shape[-1])
+                chunk_size_actual = end - start
+                if overlap != 0:
+                    if chunk_size_actual not in windows:
+                        windows[chunk_size_actual] = np.tile(np.hanning(chunk_size_actual)[None, None, :], (1, 2, 1))
+                    window = windows[chunk_size_actual]
+                    result[..., start:end] += tar_wave[..., :chunk_size_actual] * window
+                    divider[..., start:end] += window
+                else:
+                    result[..., start:end] += tar_wave[..., :chunk_size_actual]
+                    divider[..., start:end] += 1
 
         # Normalizes the results by the divider to account for overlap.
         self.logger.debug("Normalizing result by dividing result by divider.")
@@ -445,7 +463,7 @@ class MDXSeparator(CommonSeparator):
                 self.logger.debug("Model run on the spectrum without denoising.")
 
         # Applying the inverse STFT to convert the spectrum back to the time domain.
-        result = self.stft.inverse(torch.tensor(spec_pred).to(self.torch_device)).cpu().detach().numpy()
+        result = self.stft.inverse(torch.as_tensor(spec_pred).to(self.torch_device)).cpu().detach().numpy()
         self.logger.debug(f"Inverse STFT applied. Returning result with shape: {result.shape}")
 
         return result
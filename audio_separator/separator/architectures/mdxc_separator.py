@@ -1,4 +1,3 @@
-import os
 import sys
 
 import torch
@@ -133,7 +132,7 @@ class MDXCSeparator(CommonSeparator):
         self.secondary_source = None
 
         self.audio_file_path = audio_file_path
-        self.audio_file_base = os.path.splitext(os.path.basename(audio_file_path))[0]
+        self.audio_file_base = self.get_audio_file_base(audio_file_path)
 
         self.logger.debug(f"Preparing mix for input audio file {self.audio_file_path}...")
         mix = self.prepare_mix(self.audio_file_path)
@@ -17,6 +17,9 @@ class CommonSeparator:
     This class contains the common methods and attributes common to all architecture-specific Separator classes.
     """
 
+    # Output formats written through libsndfile when use_soundfile is set; anything else (e.g. M4A/AAC) goes through pydub
+    SOUNDFILE_FORMATS = ("wav", "flac")
+
     ALL_STEMS = "All Stems"
     VOCAL_STEM = "Vocals"
     INST_STEM = "Instrumental"
@@ -64,6 +67,7 @@ class CommonSeparator:
         self.torch_device_cpu = config.get("torch_device_cpu")
         self.torch_device_mps = config.get("torch_device_mps")
         self.onnx_execution_provider = config.get("onnx_execution_provider")
+        self.onnx_session_options = config.get("onnx_session_options")
 
         # Model data
         self.model_name = config.get("model_name")
@@ -123,6 +127,9 @@ class CommonSeparator:
         self.primary_stem_output_path = None
         self.secondary_stem_output_path = None
 
+        # Every stem written for the current input, keyed by stem name
+        self.processed_stems = {}
+
         self.cached_sources_map = {}
 
     def secondary_stem(self, primary_stem: str):
@@ -148,6 +155,7 @@ class CommonSeparator:
         """
         self.logger.debug(f"Finalizing {stem_name} stem processing and writing audio...")
         self.write_audio(stem_path, source)
+        self.processed_stems[stem_name] = source
 
         return {stem_name: source}
 
@@ -238,13 +246,17 @@ class CommonSeparator:
         Pydub supports a much wider range of audio formats and produces better encoded lossy files for some formats.
         Soundfile is used for very large files (longer than 1 hour), as pydub has memory issues with large files:
         https://github.com/jiaaro/pydub/issues/135
+        When use_soundfile is set, only SOUNDFILE_FORMATS are written with soundfile; other formats still use pydub.
         """
-        # Get the duration of the input audio file
-        duration_seconds = librosa.get_duration(filename=self.audio_file_path)
+        # Get the duration of the input audio, which may be a file or an in-memory array of shape (samples, channels)
+        if isinstance(self.audio_file_path, np.ndarray):
+            duration_seconds = self.audio_file_path.shape[0] / self.sample_rate
+        else:
+            duration_seconds = librosa.get_duration(filename=self.audio_file_path)
         duration_hours = duration_seconds / 3600
         self.logger.info(f"Audio duration is {duration_hours:.2f} hours ({duration_seconds:.2f} seconds).")
 
-        if self.use_soundfile:
+        if self.use_soundfile and stem_path.lower().split(".")[-1] in self.SOUNDFILE_FORMATS:
             self.logger.warning(f"Using soundfile for writing.")
             self.write_audio_soundfile(stem_path, stem_source)
         else:
@@ -260,7 +272,7 @@ class CommonSeparator:
         stem_source = spec_utils.normalize(wave=stem_source, max_peak=self.normalization_threshold, min_peak=self.amplification_threshold)
 
         # Check if the numpy array is empty or contains very low values
-        if np.max(np.abs(stem_source)) < 1e-6:
+        if spec_utils.peak_amplitude(stem_source) < 1e-6:
             self.logger.warning("Warning: stem_source array is near-silent or empty.")
             return
 
@@ -320,7 +332,7 @@ class CommonSeparator:
         stem_source = spec_utils.normalize(wave=stem_source, max_peak=self.normalization_threshold, min_peak=self.amplification_threshold)
 
         # Check if the numpy array is empty or contains very low values
-        if np.max(np.abs(stem_source)) < 1e-6:
+        if spec_utils.peak_amplitude(stem_source) < 1e-6:
             self.logger.warning("Warning: stem_source array is near-silent or empty.")
             return
 
@@ -329,23 +341,11 @@ class CommonSeparator:
             os.makedirs(self.output_dir, exist_ok=True)
             stem_path = os.path.join(self.output_dir, stem_path)
 
-        # Correctly interleave stereo channels if needed
-        if stem_source.shape[1] == 2:
-            # If the audio is already interleaved, ensure it's in the correct order
-            # Check if the array is Fortran contiguous (column-major)
-            if stem_source.flags["F_CONTIGUOUS"]:
-                # Convert to C contiguous (row-major)
-                stem_source = np.ascontiguousarray(stem_source)
-            # Otherwise, perform interleaving
-            else:
-                stereo_interleaved = np.empty((2 * stem_source.shape[0],), dtype=np.int16)
-                # Left channel
-                stereo_interleaved[0::2] = stem_source[:, 0]
-                # Right channel
-                stereo_interleaved[1::2] = stem_source[:, 1]
-                stem_source = stereo_interleaved
+        # soundfile takes (frames, channels) data and interleaves the channels itself in libsndfile,
+        # so the array only needs to be C contiguous (row-major); no manual int16 interleaving is required
+        stem_source = np.ascontiguousarray(stem_source)
 
-        self.logger.debug(f"Interleaved audio data shape: {stem_source.shape}")
+        self.logger.debug(f"Audio data shape for writing: {stem_source.shape}")
 
         """
         Write audio using soundfile (for formats other than M4A).
@@ -357,6 +357,7 @@ class CommonSeparator:
             self.logger.debug(f"Exported audio file successfully to {stem_path}")
         except Exception as e:
             self.logger.error(f"Error exporting audio file: {e}")
+            raise
 
     def clear_gpu_cache(self):
         """
@@ -371,6 +372,15 @@ class CommonSeparator:
             self.logger.debug("Clearing CUDA cache...")
             torch.cuda.empty_cache()
 
+    def get_audio_file_base(self, audio_file_path):
+        """
+        Returns the base name used for output filenames: the input filename without its extension,
+        or "audio" when the input is an in-memory array rather than a file.
+        """
+        if isinstance(audio_file_path, np.ndarray):
+            return "audio"
+        return os.path.splitext(os.path.basename(audio_file_path))[0]
+
     def clear_file_specific_paths(self):
         """
         Clears the file-specific variables which need to be cleared between processing different audio inputs.
@@ -386,6 +396,8 @@ class CommonSeparator:
         self.primary_stem_output_path = None
         self.secondary_stem_output_path = None
 
+        self.processed_stems = {}
+
     def sanitize_filename(self, filename):
         """
         Cleans the filename by replacing invalid characters with underscores.
@@ -15,6 +15,7 @@ from typing import Optional
 import hashlib
 import json
 import yaml
+import numpy as np
 import requests
 import torch
 import torch.amp.autocast_mode as autocast_mode
@@ -47,6 +48,10 @@ class Separator:
         sample_rate (int): The sample rate of the audio.
         use_soundfile (bool): Use soundfile for audio writing, can solve OOM issues.
         use_autocast (bool): Flag to use PyTorch autocast for faster inference.
+        onnx_session_options (onnxruntime.SessionOptions): Optional ONNX Runtime session options used for ONNX model inference.
+        use_tensorrt (bool): Flag to run ONNX models with the TensorRT execution provider (FP16, cached engines) on CUDA devices.
+        tensorrt_cache_dir (str): The directory where built TensorRT engines are cached. Defaults to "tensorrt_cache" inside model_file_dir.
+        onnx_gpu_mem_limit (int): Optional cap in bytes on the CUDA memory arena of each ONNX Runtime session.
 
     MDX Architecture Specific Attributes:
         hop_length (int): The hop length for STFT.
@@ -63,6 +68,7 @@ class Separator:
         enable_post_process: False
         post_process_threshold: 0.2
         high_end_process: False
+        quantize_int8: False
 
     Demucs Architecture Specific Attributes & Defaults:
         segment_size: "Default"
@@ -94,8 +100,12 @@ class Separator:
         use_soundfile=False,
         use_autocast=False,
         use_directml=False,
+        onnx_session_options=None,
+        use_tensorrt=False,
+        tensorrt_cache_dir=None,
+        onnx_gpu_mem_limit=None,
         mdx_params={"hop_length": 1024, "segment_size": 256, "overlap": 0.25, "batch_size": 1, "enable_denoise": False},
-        vr_params={"batch_size": 1, "window_size": 512, "aggression": 5, "enable_tta": False, "enable_post_process": False, "post_process_threshold": 0.2, "high_end_process": False},
+        vr_params={"batch_size": 1, "window_size": 512, "aggression": 5, "enable_tta": False, "enable_post_process": False, "post_process_threshold": 0.2, "high_end_process": False, "quantize_int8": False},
         demucs_params={"segment_size": "Default", "shifts": 2, "overlap": 0.25, "segments_enabled": True},
         mdxc_params={"segment_size": 256, "override_model_segment_size": False, "batch_size": 1, "overlap": 8, "pitch_shift": 0},
         info_only=False,
@@ -181,6 +191,13 @@ class Separator:
         self.use_soundfile = use_soundfile
         self.use_autocast = use_autocast
         self.use_directml = use_directml
+        self.onnx_session_options = onnx_session_options
+        self.use_tensorrt = use_tensorrt
+        self.tensorrt_cache_dir = tensorrt_cache_dir
+
+        if onnx_gpu_mem_limit is not None and (isinstance(onnx_gpu_mem_limit, bool) or not isinstance(onnx_gpu_mem_limit, int) or onnx_gpu_mem_limit <= 0):
+            raise ValueError(f"The onnx_gpu_mem_limit setting is {onnx_gpu_mem_limit!r} but it must be a positive whole number of bytes.")
+        self.onnx_gpu_mem_limit = onnx_gpu_mem_limit
 
         # These are parameters which users may want to configure so we expose them to the top-level Separator class,
         # even though they are specific to a single model architecture
@@ -192,6 +209,7 @@ class Separator:
 
         self.onnx_execution_provider = None
         self.model_instance = None
+        self.model_filename = None
 
         self.model_is_uvr_vip = False
         self.model_friendly_name = None
@@ -294,10 +312,25 @@ class Separator:
         self.torch_device = torch.device("cuda")
         if "CUDAExecutionProvider" in ort_providers:
             self.logger.info("ONNXruntime has CUDAExecutionProvider available, enabling acceleration")
-            self.onnx_execution_provider = ["CUDAExecutionProvider"]
+            # Grow the CUDA arena only by what each allocation needs, so several resident sessions (e.g. a model chain) don't over-reserve GPU memory
+            cuda_options = {"arena_extend_strategy": "kSameAsRequested"}
+            if self.onnx_gpu_mem_limit is not None:
+                cuda_options["gpu_mem_limit"] = self.onnx_gpu_mem_limit
+            self.onnx_execution_provider = [("CUDAExecutionProvider", cuda_options)]
         else:
             self.logger.warning("CUDAExecutionProvider not available in ONNXruntime, so acceleration will NOT be enabled")
 
+        if self.use_tensorrt:
+            if "TensorrtExecutionProvider" in ort_providers:
+                # Built engines are cached next to the model files, so the slow engine build only happens once per model
+                tensorrt_cache_dir = self.tensorrt_cache_dir or os.path.join(self.model_file_dir, "tensorrt_cache")
+                os.makedirs(tensorrt_cache_dir, exist_ok=True)
+                self.logger.info(f"ONNXruntime has TensorrtExecutionProvider available, enabling it with engine cache at {tensorrt_cache_dir}")
+                tensorrt_options = {"trt_fp16_enable": True, "trt_engine_cache_enable": True, "trt_engine_cache_path": tensorrt_cache_dir, "trt_max_workspace_size": 4 << 30}
+                self.onnx_execution_provider = [("TensorrtExecutionProvider", tensorrt_options)] + (self.onnx_execution_provider or []) + ["CPUExecutionProvider"]
+            else:
+                self.logger.warning("TensorrtExecutionProvider not available in ONNXruntime, falling back to other providers")
+
     def configure_mps(self, ort_providers):
         """
         This method configures the Apple Silicon MPS/CoreML device for PyTorch and ONNX Runtime, if available.
@@ -741,6 +774,7 @@ class Separator:
             "torch_device_cpu": self.torch_device_cpu,
             "torch_device_mps": self.torch_device_mps,
             "onnx_execution_provider": self.onnx_execution_provider,
+            "onnx_session_options": self.onnx_session_options,
             "model_name": model_name,
             "model_path": model_path,
             "model_data": model_data,
@@ -773,6 +807,9 @@ class Separator:
         self.logger.debug(f"Instantiating separator class for model type {model_type}: {separator_class}")
         self.model_instance = separator_class(common_config=common_params, arch_config=self.arch_specific_params[model_type])
 
+        # Track which model is loaded, so callers can skip reloading the same model
+        self.model_filename = model_filename
+
         # Log the completion of the model load process
         self.logger.debug("Loading model completed.")
         self.logger.info(f'Load model duration: {time.strftime("%H:%M:%S", time.gmtime(int(time.perf_counter() - load_model_start_time)))}')
@@ -830,19 +867,52 @@ class Separator:
 
         return output_files
 
-    def _separate_file(self, audio_file_path, custom_output_names=None):
+    def separate_array(self, mix, custom_output_names=None):
+        """
+        Separates in-memory audio samples into stems and returns the stems as arrays.
+
+        This lets chained separations (e.g. vocals -> lead/backing vocals -> de-reverb) feed one step's stem directly into
+        the next step, instead of re-reading and decoding the intermediate file from disk. Stems are still written to
+        output_dir, exactly as with separate(). MDX, MDXC (including all stems of multi-stem models) and VR models are supported.
+
+        Parameters:
+        - mix (np.ndarray): Audio samples at 44.1kHz, shaped (samples, channels) like the returned stems.
+        - custom_output_names (dict, optional): Custom names for the output files. Defaults to None.
+
+        Returns:
+        - stems (dict of str to np.ndarray): The separated stems keyed by stem name, each shaped (samples, channels).
+        """
+        # Check if the model and device are properly initialized
+        if not (self.torch_device and self.model_instance):
+            raise ValueError("Initialization failed or model not loaded. Please load a model before attempting to separate.")
+
+        # Architecture modules are imported lazily in load_model, so only import Demucs here when it's needed for the check
+        from audio_separator.separator.architectures.demucs_separator import DemucsSeparator
+
+        if isinstance(self.model_instance, DemucsSeparator):
+            raise ValueError("separate_array is not supported for Demucs models, please use separate instead.")
+
+        stems = {}
+        self._separate_file(mix, custom_output_names, stem_sources=stems)
+        return stems
+
+    def _separate_file(self, audio_file_path, custom_output_names=None, stem_sources=None):
         """
         Internal method to handle separation for a single audio file.
         This method performs the actual separation process for a single audio file. It logs the start and end of the process,
         handles autocast if enabled, and ensures GPU cache is cleared after processing.
         Parameters:
-        - audio_file_path (str): The path to the audio file.
+        - audio_file_path (str or np.ndarray): The path to the audio file, or in-memory samples shaped (samples, channels).
         - custom_output_names (dict, optional): Custom names for the output files. Defaults to None.
+        - stem_sources (dict, optional): If provided, filled with the separated stem arrays keyed by stem name. Defaults to None.
         Returns:
         - output_files (list of str): A list containing the paths to the separated audio stem files.
         """
         # Log the start of the separation process
-        self.logger.info(f"Starting separation process for audio_file_path: {audio_file_path}")
+        if isinstance(audio_file_path, np.ndarray):
+            self.logger.info(f"Starting separation process for in-memory audio with shape: {audio_file_path.shape}")
+        else:
+            self.logger.info(f"Starting separation process for audio_file_path: {audio_file_path}")
         separate_start_time = time.perf_counter()
 
         # Log normalization and amplification thresholds
@@ -862,6 +932,14 @@ class Separator:
         # Clear GPU cache to free up memory
         self.model_instance.clear_gpu_cache()
 
+        # Keep the separated stems for the caller before they are cleared below,
+        # including any stems beyond the primary/secondary pair written by multi-stem models
+        if stem_sources is not None:
+            for stem_name, source in ((self.model_instance.primary_stem_name, self.model_instance.primary_source), (self.model_instance.secondary_stem_name, self.model_instance.secondary_source)):
+                if isinstance(source, np.ndarray):
+                    stem_sources[stem_name] = source
+            stem_sources.update(self.model_instance.processed_stems)
+
         # Unset separation parameters to prevent accidentally re-using the wrong source files or output paths
         self.model_instance.clear_file_specific_paths()
 
@@ -96,6 +96,21 @@ def make_padding(width, cropsize, offset):
     return left, right, roi_size
 
 
+def peak_amplitude(wave):
+    """Return the maximum absolute sample value of a waveform.
+
+    Computed from the min and max reductions so that no temporary ``np.abs`` copy
+    of the whole waveform is allocated.
+
+    Args:
+        wave (array-like): Audio waveform.
+
+    Returns:
+        float: Peak absolute amplitude.
+    """
+    return max(wave.max(), -wave.min())
+
+
 def normalize(wave, max_peak=1.0, min_peak=None):
     """Normalize (or amplify) audio waveform to a specified peak value.
 
@@ -106,7 +121,7 @@ def normalize(wave, max_peak=1.0, min_peak=None):
     Returns:
         array-like: Normalized or original waveform.
     """
-    maxv = np.abs(wave).max()
+    maxv = peak_amplitude(wave)
     if maxv > max_peak:
         wave *= max_peak / maxv
     elif min_peak is not None and maxv < min_peak:
@@ -16,6 +16,16 @@ class STFT:
         self.device = device
         # Create a Hann window tensor for use in the STFT.
         self.hann_window = torch.hann_window(window_length=self.n_fft, periodic=True)
+        # Copies of the window already moved to each device, so it isn't transferred again on every call
+        self.device_windows = {}
+
+    def get_window(self, device):
+        """
+        Returns the Hann window on the given device, copying it there only on first use.
+        """
+        if device not in self.device_windows:
+            self.device_windows[device] = self.hann_window.to(device)
+        return self.device_windows[device]
 
     def __call__(self, input_tensor):
         # Determine if the input tensor's device is not a standard computing device (i.e., not CPU or CUDA).
@@ -26,7 +36,7 @@ class STFT:
             input_tensor = input_tensor.cpu()
 
         # Transfer the pre-defined window tensor to the same device as the input tensor.
-        stft_window = self.hann_window.to(input_tensor.device)
+        stft_window = self.get_window(input_tensor.device)
 
         # Extract batch dimensions (all dimensions except the last two which are channel and time).
         batch_dimensions = input_tensor.shape[:-2]
@@ -105,7 +115,7 @@ class STFT:
             input_tensor = input_tensor.cpu()
 
         # Transfer the pre-defined Hann window tensor to the same device as the input tensor.
-        stft_window = self.hann_window.to(input_tensor.device)
+        stft_window = self.get_window(input_tensor.device)
 
         batch_dimensions, channel_dim, freq_dim, time_dim, num_freq_bins = self.calculate_inverse_dimensions(input_tensor)
 
@@ -1,130 +1,388 @@
 import os
 import json
-import base64
+import mmap
 import tempfile
 import logging
 import shutil
 from typing import Dict, Any, Optional
 import traceback
+import uuid
+import wave
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 
+# RunPod 네트워크 볼륨이 연결되어 있으면 캐시(컴파일 결과, 다운로드 모델)를 볼륨에 보존하여 워커가 교체되어도 재사용
+RUNPOD_VOLUME_DIR = "/runpod-volume"
+CACHE_ROOT = os.path.join(RUNPOD_VOLUME_DIR, "cache") if os.path.isdir(RUNPOD_VOLUME_DIR) else "/tmp"
+
+# torch / onnxruntime 임포트 전에 설정해야 적용되는 환경변수 (기존 값이 있으면 유지)
+# - CUDA 커널은 최초 사용 시점에 로드하고, Inductor FX 그래프 캐시는 CACHE_ROOT에 보존
+# - OMP 스레드 수는 컨테이너에 할당된 CPU 수로 제한해 스레드 과다 생성을 방지
+os.environ.setdefault("CUDA_MODULE_LOADING", "LAZY")
+os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.join(CACHE_ROOT, "inductor_cache"))
+os.environ.setdefault("OMP_NUM_THREADS", str(len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()))
+
+import numpy as np
+import requests
 import runpod
+import onnxruntime as ort
 from audio_separator.separator import Separator
+from audio_separator.separator.architectures.mdx_separator import MDXSeparator
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# SIMD(AVX2/AVX-512) 가속 base64 구현 사용 (미설치 환경은 표준 라이브러리로 대체)
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
 # RunPod 업로드 유틸리티 (URL 반환용)
 try:
     from runpod.serverless.utils import rp_upload
 except Exception:  # 로컬 환경 대비
     rp_upload = None
 
+# 모델 가중치 디렉토리 (Docker 이미지 빌드 시 미리 다운로드되어 포함됨, 미설정 시 CACHE_ROOT에 다운로드)
+MODEL_FILE_DIR = os.getenv("MODEL_FILE_DIR", os.path.join(CACHE_ROOT, "audio-separator-models/"))
+
+# TensorRT 엔진 캐시 디렉토리 (엔진 빌드는 수십 초가 걸리므로 볼륨에 보존)
+TENSORRT_CACHE_DIR = os.getenv("TENSORRT_CACHE_DIR", os.path.join(CACHE_ROOT, "tensorrt_cache"))
+
+# 요청 입력 파일용 임시 디렉토리 위치 (RAM 기반 tmpfs인 /dev/shm이 있으면 사용해 디스크 쓰기/읽기 왕복 제거)
+INPUT_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# 입력 파일을 /dev/shm에 둘 최소 여유 공간 (tmpfs는 컨테이너 메모리를 사용하고 Docker 기본 크기는 64MB이므로 부족하면 디스크 사용)
+INPUT_SHM_MIN_FREE_BYTES = int(os.getenv("INPUT_SHM_MIN_FREE_MB", "1024")) * 1024 * 1024
+
+# 워커 단위 작업 디렉토리 (요청마다 하위 디렉토리만 생성/삭제, 단계별 출력 stem은 용량이 크므로 디스크에 기록)
+WORK_DIR = os.path.join(tempfile.gettempdir(), "worker-work")
+os.makedirs(WORK_DIR, exist_ok=True)
+# 요청 입력 파일용 작업 디렉토리 (/dev/shm 사용 시, 요청 작업 디렉토리와 같은 이름의 하위 디렉토리 사용)
+INPUT_WORK_DIR = os.path.join(INPUT_TMP_DIR, "worker-input") if INPUT_TMP_DIR else None
+if INPUT_WORK_DIR:
+    os.makedirs(INPUT_WORK_DIR, exist_ok=True)
+
+# VR 모델(DeReverb/Denoise)을 CPU에서 실행할 때 LSTM/Linear 레이어를 INT8 동적 양자화 (GPU에서는 autocast FP16 사용)
+VR_QUANTIZE_INT8 = os.getenv("VR_QUANTIZE_INT8", "false").lower() == "true"
+
+# MDX(ONNX) 모델을 TensorRT FP16으로 실행 (TensorRT 라이브러리가 설치된 이미지에서만 사용)
+USE_TENSORRT = os.getenv("USE_TENSORRT", "false").lower() == "true"
+
+# 모델별 ONNX 세션의 CUDA 메모리 아레나 상한 (바이트, 여러 모델을 한 GPU에 상주시킬 때 설정, 미설정 시 제한 없음)
+ONNX_GPU_MEM_LIMIT = int(os.getenv("ONNX_GPU_MEM_LIMIT", "0")) or None
+
+# 모델 추론 배치 크기 (VRAM이 작은 GPU에서는 환경변수 또는 요청의 mdx_batch_size로 낮춤)
+MDX_BATCH_SIZE = int(os.getenv("MDX_BATCH_SIZE", "4"))
+VR_BATCH_SIZE = int(os.getenv("VR_BATCH_SIZE", "16"))
+# MDX STFT hop 길이와 세그먼트 크기 (청크 길이 = hop 길이 * (세그먼트 크기 - 1))
+MDX_HOP_LENGTH = 1024
+MDX_SEGMENT_SIZE = 256
+
+# 고급 분리 파이프라인에서 사용하는 모델 목록
+REQUIRED_MODELS = [
+    'Kim_Vocal_1.onnx',  # Step 1: Vocals/Instrumental 분리
+    'UVR_MDXNET_KARA.onnx',  # Step 2: Lead/Backing 분리
+    'UVR-De-Echo-Aggressive.pth',  # Step 3: DeReverb
+    'UVR-DeNoise.pth'  # Step 4: Denoise
+]
+
 # 전역 변수로 Separator 인스턴스 저장 (Cold start 최적화)
+# - separator: 모델 목록 조회 및 파이프라인 외 모델 요청용 범용 인스턴스
+# - separators: 파이프라인 모델 파일명 -> 해당 모델이 로드된 전용 인스턴스
 separator = None
+separators: Dict[str, Separator] = {}
+
+# GPU 추론 및 Separator 상태 변경(모델 로드, 출력 형식 설정)을 직렬화하는 락
+# - 동시 요청 처리 시 base64 디코딩/파일 I/O/업로드는 락 밖에서 겹쳐 실행됨
+GPU_LOCK = threading.RLock()
+
+# 동시에 처리할 최대 작업 수
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "2"))
+
+# GPU 추론과 겹쳐 실행할 출력 후처리(base64 인코딩/업로드)용 백그라운드 스레드 풀
+_BACKGROUND_POOL = ThreadPoolExecutor(max_workers=2)
+
+# 출력 파일 병렬 업로드용 스레드 풀 (네트워크 I/O 대기를 파일 간에 겹침)
+_UPLOAD_POOL = ThreadPoolExecutor(max_workers=4)
+
+def _create_onnx_session_options() -> ort.SessionOptions:
+    """MDX ONNX 모델 추론에 사용할 ONNX Runtime 세션 옵션을 생성합니다."""
+    session_options = ort.SessionOptions()
+    session_options.intra_op_num_threads = 0  # 0: 물리 코어 수에 맞춰 자동 설정
+    session_options.inter_op_num_threads = 1
+    session_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return session_options
+
+def _create_separator() -> Separator:
+    """공통 설정으로 새 Separator 인스턴스를 생성합니다."""
+    # 출력 디렉토리 환경변수 우선 적용
+    output_dir = os.getenv("OUTPUT_DIR", "/workspace/output_results/")
+    os.makedirs(output_dir, exist_ok=True)
+
+    instance = Separator(
+        log_level=logging.INFO,
+        model_file_dir=MODEL_FILE_DIR,
+        output_dir=output_dir,
+        output_format="WAV",
+        normalization_threshold=0.9,
+        amplification_threshold=0.0,
+        use_autocast=True,  # GPU 가속 사용
+        use_soundfile=True,  # WAV/FLAC 출력은 ffmpeg 프로세스 대신 libsndfile로 바로 쓰기 (그 외 형식은 pydub 사용)
+        onnx_session_options=_create_onnx_session_options(),
+        use_tensorrt=USE_TENSORRT,
+        tensorrt_cache_dir=TENSORRT_CACHE_DIR,
+        onnx_gpu_mem_limit=ONNX_GPU_MEM_LIMIT,
+        mdx_params={"hop_length": MDX_HOP_LENGTH, "segment_size": MDX_SEGMENT_SIZE, "overlap": 0.25, "batch_size": MDX_BATCH_SIZE, "enable_denoise": False},
+        vr_params={"batch_size": VR_BATCH_SIZE, "window_size": 512, "aggression": 5, "enable_tta": False, "enable_post_process": False, "post_process_threshold": 0.2, "high_end_process": False, "quantize_int8": VR_QUANTIZE_INT8}
+    )
+    logger.info(f"Separator output_dir 설정: {instance.output_dir}")
+    return instance
 
 def load_separator():
-    """Separator 인스턴스를 로드하고 모델을 준비합니다."""
+    """범용 Separator 인스턴스를 로드합니다."""
     global separator
     if separator is None:
+        logger.info("범용 Separator 인스턴스를 초기화합니다...")
+        separator = _create_separator()
+    return separator
+
+def get_model_separator(model_filename: str) -> Separator:
+    """
+    model_filename 모델이 로드된 Separator 인스턴스를 반환합니다.
+
+    파이프라인 모델(REQUIRED_MODELS)은 모델별 전용 인스턴스에 한 번만 로드하여 재사용하고,
+    그 외 모델은 범용 인스턴스에 로드하며, 직전 요청과 같은 모델이면 재로드하지 않습니다.
+    """
+    with GPU_LOCK:
         try:
-            logger.info("Separator 인스턴스를 초기화하고 모델을 로드합니다...")
-
-            # 출력 디렉토리 환경변수 우선 적용
-            output_dir = os.getenv("OUTPUT_DIR", "/workspace/output_results/")
-            os.makedirs(output_dir, exist_ok=True)
-
-            separator = Separator(
-                log_level=logging.INFO,
-                model_file_dir="/tmp/audio-separator-models/",
-                output_dir=output_dir,
-                output_format="WAV",
-                normalization_threshold=0.9,
-                amplification_threshold=0.0,
-                use_autocast=True  # GPU 가속 사용
-            )
-            logger.info(f"Separator output_dir 설정: {separator.output_dir}")
-            
-            # 필요한 모델들이 다운로드되어 있는지 확인하고 없으면 다운로드
-            required_models = [
-                'Kim_Vocal_1.onnx',  # Step 1: Vocals/Instrumental 분리
-                'UVR_MDXNET_KARA.onnx',  # Step 2: Lead/Backing 분리
-                'UVR-De-Echo-Aggressive.pth',  # Step 3: DeReverb
-                'UVR-DeNoise.pth'  # Step 4: Denoise
-            ]
-            
-            for model in required_models:
-                model_path = os.path.join("/tmp/audio-separator-models/", model)
-                if not os.path.exists(model_path):
-                    logger.info(f"모델이 없습니다. 다운로드 중: {model}")
-                    try:
-                        separator.download_model_and_data(model)
-                        logger.info(f"모델 다운로드 완료: {model}")
-                    except Exception as e:
-                        logger.warning(f"모델 다운로드 실패: {model} - {e}")
-            
-            # 기본 모델 로드 (Kim_Vocal_1.onnx 사용)
-            separator.load_model("Kim_Vocal_1.onnx")
-            logger.info("모델 로딩 완료")
+            if model_filename in REQUIRED_MODELS:
+                if model_filename not in separators:
+                    logger.info(f"Separator 인스턴스를 초기화하고 모델을 로드합니다: {model_filename}")
+                    instance = _create_separator()
+                    instance.load_model(model_filename)
+                    separators[model_filename] = instance
+                    logger.info(f"모델 로딩 완료: {model_filename}")
+                return separators[model_filename]
+
+            instance = load_separator()
+            # 이미 같은 모델이 로드되어 있으면 재로드 생략
+            if instance.model_filename != model_filename:
+                logger.info(f"모델 로드: {model_filename}")
+                instance.load_model(model_filename)
+            return instance
         except Exception as e:
-            logger.error(f"모델 로딩 실패: {str(e)}")
+            logger.error(f"모델 로딩 실패: {model_filename} - {str(e)}")
             raise
-    return separator
+
+def preload_separators():
+    """파이프라인의 모든 모델을 미리 로드합니다."""
+    for model in REQUIRED_MODELS:
+        get_model_separator(model)
+
+@contextmanager
+def _request_workspace():
+    """
+    요청 전용 작업 디렉토리와 정리 대상 파일 목록을 제공합니다.
+
+    종료 시 rmtree로 디렉토리를 순회하지 않고, 목록에 등록된 파일만 삭제한 뒤 빈 디렉토리를 제거합니다.
+    처리 도중 실패해 목록에 등록되지 않은 파일이 남아 있으면 rmtree로 디렉토리째 삭제합니다.
+    """
+    request_id = uuid.uuid4().hex
+    request_dir = os.path.join(WORK_DIR, request_id)
+    os.mkdir(request_dir)
+    created_files: list[str] = []
+    try:
+        yield request_dir, created_files
+    finally:
+        for path in created_files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        _remove_dir(request_dir)
+        # /dev/shm에 만든 입력 디렉토리 정리 (입력을 디스크에 둔 요청은 디렉토리가 없음)
+        if INPUT_WORK_DIR:
+            _remove_dir(os.path.join(INPUT_WORK_DIR, request_id))
+
+def _remove_dir(path: str):
+    """빈 디렉토리를 제거하고, 등록되지 않은 파일이 남아 있으면 디렉토리째 삭제합니다."""
+    try:
+        os.rmdir(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        # 실패한 요청이 남긴 출력 파일이 장시간 실행되는 워커에 누적되지 않도록 강제 정리
+        logger.warning(f"등록되지 않은 파일이 남아 디렉토리째 삭제: {path} - {e}")
+        shutil.rmtree(path, ignore_errors=True)
+
+def _input_file_path(request_dir: str) -> str:
+    """
+    요청 입력 파일 경로를 반환합니다.
+
+    /dev/shm 여유 공간이 충분하면 RAM에, 아니면 요청 작업 디렉토리에 생성합니다.
+    출력 파일명이 입력 파일명을 따르므로 어느 쪽이든 파일명은 input.wav로 같습니다.
+    """
+    if INPUT_WORK_DIR and shutil.disk_usage(INPUT_WORK_DIR).free >= INPUT_SHM_MIN_FREE_BYTES:
+        input_dir = os.path.join(INPUT_WORK_DIR, os.path.basename(request_dir))
+        os.makedirs(input_dir, exist_ok=True)
+        return os.path.join(input_dir, "input.wav")
+    return os.path.join(request_dir, "input.wav")
+
+def _write_warmup_wav(path: str, seconds: float = 1.0, sample_rate: int = 44100):
+    """워밍업용 짧은 스테레오 WAV 파일을 생성합니다."""
+    # 완전 무음은 Separator가 빈 오디오로 거부하므로 작은 크기의 톤을 사용
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = (0.05 * np.sin(2 * np.pi * 440.0 * t) * 32767).astype(np.int16)
+    frames = np.repeat(tone[:, None], 2, axis=1)
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(2)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(frames.tobytes())
+
+def _warmup_seconds(sample_rate: int = 44100) -> float:
+    """
+    MDX 모델의 첫 배치가 실제 요청처럼 MDX_BATCH_SIZE개 청크로 가득 차는 워밍업 오디오 길이(초)를 계산합니다.
+
+    cuDNN/TensorRT 실행 계획은 입력 shape별로 만들어지므로, 배치가 덜 찬 짧은 오디오로는 실제 요청의 shape를 미리 준비할 수 없습니다.
+    """
+    chunk_size = MDX_HOP_LENGTH * (MDX_SEGMENT_SIZE - 1)
+    return MDX_BATCH_SIZE * chunk_size / sample_rate
+
+def warmup_separators():
+    """
+    파이프라인의 각 모델로 MDX 배치 하나를 채우는 길이의 오디오를 한 번씩 분리합니다.
+
+    cuDNN 알고리즘 탐색, ONNX Runtime 메모리 arena 할당 등 최초 추론 시에만 발생하는 비용을
+    컨테이너 시작 시점에 미리 치러, 첫 사용자 요청이 이를 부담하지 않도록 합니다.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        warmup_file = os.path.join(temp_dir, "warmup.wav")
+        _write_warmup_wav(warmup_file, seconds=_warmup_seconds())
+
+        for model in REQUIRED_MODELS:
+            try:
+                separator_instance = get_model_separator(model)
+                output_files = separator_instance.separate(warmup_file)
+                # 워밍업 출력은 사용하지 않으므로 삭제
+                for output_file in _resolve_paths(output_files, separator_instance.output_dir):
+                    os.remove(output_file)
+                logger.info(f"워밍업 완료: {model}")
+            except Exception as e:
+                logger.warning(f"워밍업 실패: {model} - {e}")
+
+def _parse_mdx_batch_size(job_input: Dict[str, Any]) -> int:
+    """요청의 mdx_batch_size를 정수로 변환하고 1 이상인지 검사합니다. (미지정 시 기본값)"""
+    mdx_batch_size = int(job_input.get("mdx_batch_size", MDX_BATCH_SIZE))
+    if mdx_batch_size < 1:
+        raise ValueError(f"mdx_batch_size must be >= 1, got {mdx_batch_size}")
+    return mdx_batch_size
+
+def _separate(
+    separator_instance: Separator,
+    audio_path: str,
+    output_format: str,
+    custom_output_names: Optional[Dict[str, str]] = None,
+    mdx_batch_size: Optional[int] = None,
+    output_dir: Optional[str] = None
+) -> list[str]:
+    """요청별 출력 형식/출력 디렉토리(및 MDX 배치 크기)를 적용하여 오디오 분리를 실행합니다."""
+    with GPU_LOCK:
+        # 이미 로드된 모델 인스턴스는 로드 시점의 출력 형식/디렉토리를 유지하므로 함께 갱신
+        separator_instance.output_format = output_format
+        separator_instance.model_instance.output_format = output_format
+        if output_dir is not None:
+            separator_instance.output_dir = output_dir
+            separator_instance.model_instance.output_dir = output_dir
+        # 인스턴스는 요청 간 공유되므로 요청 값이 없으면 기본 배치 크기로 되돌림
+        if isinstance(separator_instance.model_instance, MDXSeparator):
+            separator_instance.model_instance.batch_size = mdx_batch_size or MDX_BATCH_SIZE
+        return separator_instance.separate(audio_path, custom_output_names=custom_output_names)
+
+def _write_input_audio(job_input: Dict[str, Any], input_file: str):
+    """
+    요청의 입력 오디오를 input_file에 기록합니다.
+
+    audio_url이 있으면 원본 바이트를 디스크로 바로 스트리밍하여 base64 인코딩/디코딩과 33% 크기 증가를 피하고,
+    없으면 audio_data(base64)를 디코딩합니다.
+    """
+    audio_url = job_input.get("audio_url")
+    if audio_url:
+        with requests.get(audio_url, stream=True, timeout=600) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with open(input_file, "wb") as f:
+                shutil.copyfileobj(response.raw, f, length=1 << 20)
+    else:
+        with open(input_file, "wb") as f:
+            f.write(base64.b64decode(job_input["audio_data"]))
 
 def _encode_outputs_as_base64(file_paths: list[str]) -> Dict[str, str]:
     """출력 파일을 base64로 인코딩하여 반환합니다."""
     result_files: Dict[str, str] = {}
     for output_file in file_paths:
         if os.path.exists(output_file):
+            file_name = os.path.basename(output_file)
             with open(output_file, "rb") as f:
-                file_data = f.read()
-                file_name = os.path.basename(output_file)
-                result_files[file_name] = base64.b64encode(file_data).decode('utf-8')
+                # 빈 파일은 mmap할 수 없으므로 바로 빈 문자열 처리
+                if os.fstat(f.fileno()).st_size == 0:
+                    result_files[file_name] = ""
+                    continue
+                # 파일 전체를 bytes로 복사하지 않고 페이지 캐시에서 바로 인코딩
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    result_files[file_name] = base64.b64encode(mm).decode('ascii')
         else:
             logger.warning(f"파일이 존재하지 않습니다: {output_file}")
     return result_files
 
 def _upload_outputs_and_get_urls(file_paths: list[str]) -> Dict[str, str]:
-    """출력 파일을 업로드하고 공개 URL을 반환합니다."""
+    """출력 파일을 버킷에 업로드하고 presigned URL을 반환합니다."""
     if rp_upload is None:
         raise RuntimeError("rp_upload 모듈을 사용할 수 없습니다. 런포드 서버리스 환경에서 실행해 주세요.")
 
-    uploaded_files: Dict[str, str] = {}
+    # 요청 간 파일명 충돌을 막기 위한 업로드 경로 prefix
+    prefix = uuid.uuid4().hex
+    futures = {}
     for output_file in file_paths:
         if os.path.exists(output_file):
-            try:
-                upload_result = rp_upload.upload_file(output_file)
-                # upload_result 예: { 'file_id': str, 'url'|'link': str }
-                url_value = upload_result.get('url') or upload_result.get('link')
-                uploaded_files[os.path.basename(output_file)] = url_value
-                logger.info(f"업로드 완료: {output_file} -> {url_value}")
-            except Exception as e:
-                logger.error(f"파일 업로드 실패: {output_file} - {e}")
-                raise
+            file_name = os.path.basename(output_file)
+            # 파일을 디스크에서 바로 업로드하고 presigned URL을 받음 (BUCKET_* 환경변수 사용)
+            futures[file_name] = (output_file, _UPLOAD_POOL.submit(
+                rp_upload.upload_file_to_bucket, file_name=file_name, file_location=output_file, prefix=prefix
+            ))
         else:
             logger.warning(f"파일이 존재하지 않습니다: {output_file}")
+
+    uploaded_files: Dict[str, str] = {}
+    for file_name, (output_file, future) in futures.items():
+        try:
+            url_value = future.result()
+            uploaded_files[file_name] = url_value
+            logger.info(f"업로드 완료: {output_file} -> {url_value}")
+        except Exception as e:
+            logger.error(f"파일 업로드 실패: {output_file} - {e}")
+            raise
     return uploaded_files
 
-def _resolve_single_path(path: str, candidate_dirs: list[str]) -> str:
-    """상대 경로로 전달된 파일을 후보 디렉토리에서 찾아 절대 경로로 반환."""
-    if not path:
-        return path
-    if os.path.isabs(path) and os.path.exists(path):
-        return path
-    # 그대로 존재하는지 먼저 확인
-    if os.path.exists(path):
-        return os.path.abspath(path)
-    for d in candidate_dirs:
-        candidate = os.path.join(d, path)
-        if os.path.exists(candidate):
-            return candidate
-    logger.warning(f"파일 경로 해석 실패: {path} (후보: {candidate_dirs})")
-    return path
-
-def _resolve_paths(paths: list[str], candidate_dirs: list[str]) -> list[str]:
-    return [_resolve_single_path(p, candidate_dirs) for p in paths]
-
-def handler(job):
+def _resolve_single_path(path: str, output_dir: str) -> str:
+    """Separator가 반환한 출력 파일을 출력 디렉토리 기준 절대 경로로 반환. (디렉토리 밖의 파일은 해석하지 않음)"""
+    output_dir = os.path.abspath(output_dir)
+    resolved = os.path.abspath(os.path.join(output_dir, path))
+    # 작업 디렉토리 정리 시 디렉토리 밖의 파일이 삭제되지 않도록 출력 디렉토리 안의 파일만 허용
+    if os.path.dirname(resolved) != output_dir or not os.path.isfile(resolved):
+        raise FileNotFoundError(f"출력 파일을 찾을 수 없습니다: {path} (출력 디렉토리: {output_dir})")
+    return resolved
+
+def _resolve_paths(paths: list[str], output_dir: str) -> list[str]:
+    return [_resolve_single_path(p, output_dir) for p in paths]
+
+async def handler(job):
     """
     RunPod Serverless 핸들러 함수
     
@@ -141,12 +399,13 @@ def handler(job):
         # 작업 타입 확인
         job_type = job_input.get("type", "separate")
         
+        # 블로킹 처리 함수는 워커 스레드에서 실행하여 동시 요청의 I/O 구간이 겹치도록 함
         if job_type == "list_models":
-            return handle_list_models()
+            return await asyncio.to_thread(handle_list_models)
         elif job_type == "separate":
-            return handle_separate_audio(job_input)
+            return await asyncio.to_thread(handle_separate_audio, job_input)
         elif job_type == "advanced_separate":
-            return handle_advanced_separate(job_input)
+            return await asyncio.to_thread(handle_advanced_separate, job_input)
         else:
             return {
                 "error": f"Unknown job type: {job_type}",
@@ -185,56 +444,47 @@ def handle_separate_audio(job_input):
     """기본 오디오 분리 처리"""
     try:
         # 필수 필드 검증
-        if "audio_data" not in job_input:
+        if "audio_data" not in job_input and "audio_url" not in job_input:
             return {
                 "error": "Missing audio_data",
-                "message": "audio_data field is required"
+                "message": "audio_data or audio_url field is required"
             }
         
         # 요청 파라미터 추출
-        audio_data = job_input["audio_data"]  # base64 인코딩된 오디오 데이터
         model_filename = job_input.get("model_filename", "Kim_Vocal_1.onnx")  # 기본 모델 변경
         output_format = job_input.get("output_format", "WAV")
         custom_output_names = job_input.get("custom_output_names", None)
+        mdx_batch_size = _parse_mdx_batch_size(job_input)
         return_type = job_input.get("return_type", "url")  # 'url' | 'base64'
         
-        # Separator 인스턴스 로드
-        separator_instance = load_separator()
-        
-        # 요청된 모델 로드
-        logger.info(f"모델 로드: {model_filename}")
-        separator_instance.load_model(model_filename)
-        
-        # 출력 형식 설정
-        separator_instance.output_format = output_format
-        
         # 임시 디렉토리 생성
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # base64 디코딩하여 임시 파일 생성
-            audio_bytes = base64.b64decode(audio_data)
-            input_file = os.path.join(temp_dir, "input.wav")
-            
-            with open(input_file, "wb") as f:
-                f.write(audio_bytes)
+        with _request_workspace() as (temp_dir, created_files):
+            # 입력 오디오를 임시 파일로 생성 (audio_url 다운로드 또는 base64 디코딩)
+            input_file = _input_file_path(temp_dir)
+            created_files.append(input_file)
+            _write_input_audio(job_input, input_file)
             
             logger.info(f"오디오 파일 생성: {input_file}")
             
             # 오디오 분리 실행
             logger.info("오디오 분리 시작...")
-            output_files = separator_instance.separate(
-                input_file, 
-                custom_output_names=custom_output_names
-            )
+            with GPU_LOCK:
+                # 범용 인스턴스의 모델 교체가 다른 요청의 추론과 겹치지 않도록 락 안에서 조회
+                separator_instance = get_model_separator(model_filename)
+                output_files = _separate(
+                    separator_instance,
+                    input_file,
+                    output_format,
+                    custom_output_names=custom_output_names,
+                    mdx_batch_size=mdx_batch_size,
+                    output_dir=temp_dir
+                )
             
             logger.info(f"분리 완료. 출력 파일: {output_files}")
 
-            # 반환된 상대 경로를 실제 파일 경로로 해석
-            candidate_dirs = [
-                getattr(separator_instance, "output_dir", "/tmp/output/"),
-                os.getcwd(),
-                temp_dir,
-            ]
-            resolved_outputs = _resolve_paths(output_files, candidate_dirs)
+            # 반환된 상대 경로를 실제 파일 경로로 해석 (출력은 요청 작업 디렉토리에 생성됨)
+            resolved_outputs = _resolve_paths(output_files, temp_dir)
+            created_files.extend(resolved_outputs)
             logger.info(f"해석된 출력 경로: {resolved_outputs}")
             
             if return_type == "base64":
@@ -268,113 +518,109 @@ def handle_advanced_separate(job_input):
     """고급 오디오 분리 처리 (4단계: Vocals/Instrumental, Lead/Backing, DeReverb, Denoise)"""
     try:
         # 필수 필드 검증
-        if "audio_data" not in job_input:
+        if "audio_data" not in job_input and "audio_url" not in job_input:
             return {
                 "error": "Missing audio_data",
-                "message": "audio_data field is required"
+                "message": "audio_data or audio_url field is required"
             }
         
         # 요청 파라미터 추출
-        audio_data = job_input["audio_data"]
         output_format = job_input.get("output_format", "WAV")
+        mdx_batch_size = _parse_mdx_batch_size(job_input)
         return_type = job_input.get("return_type", "url")  # 'url' | 'base64'
         
-        # Separator 인스턴스 로드
-        separator_instance = load_separator()
-        separator_instance.output_format = output_format
-        
         # 임시 디렉토리 생성
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # base64 디코딩하여 임시 파일 생성
-            audio_bytes = base64.b64decode(audio_data)
-            input_file = os.path.join(temp_dir, "input.wav")
-            
-            with open(input_file, "wb") as f:
-                f.write(audio_bytes)
+        with _request_workspace() as (temp_dir, created_files):
+            # 입력 오디오를 임시 파일로 생성 (audio_url 다운로드 또는 base64 디코딩)
+            input_file = _input_file_path(temp_dir)
+            created_files.append(input_file)
+            _write_input_audio(job_input, input_file)
             
             logger.info(f"입력 오디오 파일 생성: {input_file}")
             
-            # Path 해석을 위한 후보 디렉토리
-            candidate_dirs = [
-                getattr(separator_instance, "output_dir", "/tmp/output/"),
-                os.getcwd(),
-                temp_dir,
-            ]
-            
             # Step 1: Vocals / Instrumental 분리
             logger.info("[Step 1] Vocals / Instrumental 분리")
             try:
-                separator_instance.load_model("Kim_Vocal_1.onnx")
+                separator_instance = get_model_separator("Kim_Vocal_1.onnx")
                 logger.info("Kim_Vocal_1.onnx 모델 로드 성공")
             except Exception as e:
                 logger.warning(f"Kim_Vocal_1.onnx 로드 실패 → 대체 모델 사용: {e}")
-                separator_instance.load_model("UVR_MDXNET_KARA.onnx")
+                separator_instance = get_model_separator("UVR_MDXNET_KARA.onnx")
                 logger.info("UVR_MDXNET_KARA.onnx 모델 로드 성공")
             
-            voc_inst = separator_instance.separate(input_file)
+            voc_inst = _separate(separator_instance, input_file, output_format, mdx_batch_size=mdx_batch_size, output_dir=temp_dir)
             logger.info(f"Vocals/Instrumental 분리 완료: {len(voc_inst)}개 파일 생성")
             
             # 파일 경로 설정 (이동 없이 생성된 파일 그대로 사용)
             if len(voc_inst) >= 2:
                 instrumental_path_raw = voc_inst[0]
                 vocals_path_raw = voc_inst[1]
-                instrumental_path = _resolve_single_path(instrumental_path_raw, candidate_dirs)
-                vocals_path = _resolve_single_path(vocals_path_raw, candidate_dirs)
+                instrumental_path = _resolve_single_path(instrumental_path_raw, temp_dir)
+                vocals_path = _resolve_single_path(vocals_path_raw, temp_dir)
                 logger.info(f"Step 1 파일 경로 설정: {instrumental_path}, {vocals_path}")
+                created_files.extend([instrumental_path, vocals_path])
             else:
                 raise RuntimeError("Step 1 결과 파일이 충분하지 않습니다.")
+
+            # 반주는 이후 단계에서 사용되지 않으므로 Step 2~4와 병렬로 인코딩/업로드 시작
+            finalize_outputs = _encode_outputs_as_base64 if return_type == "base64" else _upload_outputs_and_get_urls
+            instrumental_future = _BACKGROUND_POOL.submit(finalize_outputs, [instrumental_path])
             
-            # Step 2: Lead / Backing Vocal 분리
-            logger.info("[Step 2] Lead / Backing Vocal 분리")
-            separator_instance.load_model("UVR_MDXNET_KARA.onnx")
-            backing_voc = separator_instance.separate(vocals_path)
-            logger.info(f"Lead/Backing Vocal 분리 완료: {len(backing_voc)}개 파일 생성")
+            try:
+                # Step 2: Lead / Backing Vocal 분리
+                logger.info("[Step 2] Lead / Backing Vocal 분리")
+                backing_voc = _separate(get_model_separator("UVR_MDXNET_KARA.onnx"), vocals_path, output_format, mdx_batch_size=mdx_batch_size, output_dir=temp_dir)
+                logger.info(f"Lead/Backing Vocal 분리 완료: {len(backing_voc)}개 파일 생성")
             
-            if len(backing_voc) >= 2:
-                backing_vocals_path = _resolve_single_path(backing_voc[0], candidate_dirs)
-                lead_vocals_path = _resolve_single_path(backing_voc[1], candidate_dirs)
-                logger.info(f"Step 2 파일 경로 설정: {backing_vocals_path}, {lead_vocals_path}")
-            else:
-                raise RuntimeError("Step 2 결과 파일이 충분하지 않습니다.")
+                if len(backing_voc) >= 2:
+                    backing_vocals_path = _resolve_single_path(backing_voc[0], temp_dir)
+                    lead_vocals_path = _resolve_single_path(backing_voc[1], temp_dir)
+                    logger.info(f"Step 2 파일 경로 설정: {backing_vocals_path}, {lead_vocals_path}")
+                    created_files.extend([backing_vocals_path, lead_vocals_path])
+                else:
+                    raise RuntimeError("Step 2 결과 파일이 충분하지 않습니다.")
             
-            # Step 3: DeReverb (잔향 제거)
-            logger.info("[Step 3] DeReverb 처리")
-            separator_instance.load_model("UVR-De-Echo-Aggressive.pth")
-            voc_no_reverb = separator_instance.separate(lead_vocals_path)
-            logger.info(f"DeReverb 처리 완료: {len(voc_no_reverb)}개 파일 생성")
+                # Step 3: DeReverb (잔향 제거)
+                logger.info("[Step 3] DeReverb 처리")
+                voc_no_reverb = _separate(get_model_separator("UVR-De-Echo-Aggressive.pth"), lead_vocals_path, output_format, output_dir=temp_dir)
+                logger.info(f"DeReverb 처리 완료: {len(voc_no_reverb)}개 파일 생성")
             
-            if len(voc_no_reverb) >= 2:
-                lead_vocals_no_reverb_path = _resolve_single_path(voc_no_reverb[0], candidate_dirs)
-                lead_vocals_reverb_path = _resolve_single_path(voc_no_reverb[1], candidate_dirs)
-                logger.info(f"Step 3 파일 경로 설정: {lead_vocals_no_reverb_path}, {lead_vocals_reverb_path}")
-            else:
-                raise RuntimeError("Step 3 결과 파일이 충분하지 않습니다.")
+                if len(voc_no_reverb) >= 2:
+                    lead_vocals_no_reverb_path = _resolve_single_path(voc_no_reverb[0], temp_dir)
+                    lead_vocals_reverb_path = _resolve_single_path(voc_no_reverb[1], temp_dir)
+                    logger.info(f"Step 3 파일 경로 설정: {lead_vocals_no_reverb_path}, {lead_vocals_reverb_path}")
+                    created_files.extend([lead_vocals_no_reverb_path, lead_vocals_reverb_path])
+                else:
+                    raise RuntimeError("Step 3 결과 파일이 충분하지 않습니다.")
             
-            # Step 4: Denoise (노이즈 제거)
-            logger.info("[Step 4] Denoise 처리")
-            separator_instance.load_model("UVR-DeNoise.pth")
-            voc_no_noise = separator_instance.separate(lead_vocals_no_reverb_path)
-            logger.info(f"Denoise 처리 완료: {len(voc_no_noise)}개 파일 생성")
+                # Step 4: Denoise (노이즈 제거)
+                logger.info("[Step 4] Denoise 처리")
+                voc_no_noise = _separate(get_model_separator("UVR-DeNoise.pth"), lead_vocals_no_reverb_path, output_format, output_dir=temp_dir)
+                logger.info(f"Denoise 처리 완료: {len(voc_no_noise)}개 파일 생성")
             
-            if len(voc_no_noise) >= 2:
-                lead_vocals_noise_path = _resolve_single_path(voc_no_noise[0], candidate_dirs)
-                lead_vocals_no_noise_path = _resolve_single_path(voc_no_noise[1], candidate_dirs)
-                logger.info(f"Step 4 파일 경로 설정: {lead_vocals_noise_path}, {lead_vocals_no_noise_path}")
-            else:
-                raise RuntimeError("Step 4 결과 파일이 충분하지 않습니다.")
+                if len(voc_no_noise) >= 2:
+                    lead_vocals_noise_path = _resolve_single_path(voc_no_noise[0], temp_dir)
+                    lead_vocals_no_noise_path = _resolve_single_path(voc_no_noise[1], temp_dir)
+                    logger.info(f"Step 4 파일 경로 설정: {lead_vocals_noise_path}, {lead_vocals_no_noise_path}")
+                    created_files.extend([lead_vocals_noise_path, lead_vocals_no_noise_path])
+                else:
+                    raise RuntimeError("Step 4 결과 파일이 충분하지 않습니다.")
             
-            # 결과 반환 방식 분기
-            final_output_paths = [
-                instrumental_path,
-                lead_vocals_no_noise_path
-            ]
+                # 보컬 결과 처리 후 반주 처리 결과와 합침
+                vocals_result = finalize_outputs([lead_vocals_no_noise_path])
+                final_results = {**instrumental_future.result(), **vocals_result}
+            finally:
+                # 이후 단계가 실패해도 작업 디렉토리를 지우기 전에 반주 인코딩/업로드를 취소하거나 끝날 때까지 대기
+                # (정상 경로에서는 이미 완료되었고, 실패 시 예외는 위에서 전파되므로 백그라운드 작업의 예외는 무시)
+                instrumental_future.cancel()
+                wait([instrumental_future])
 
+            # 결과 반환 방식 분기
             if return_type == "base64":
-                result_files = _encode_outputs_as_base64(final_output_paths)
                 return {
                     "success": True,
                     "message": "Advanced audio separation completed successfully",
-                    "output_files": result_files,
+                    "output_files": final_results,
                     "steps_completed": [
                         "Vocals/Instrumental separation",
                         "Lead/Backing vocal separation", 
@@ -388,11 +634,10 @@ def handle_advanced_separate(job_input):
                     "return_type": "base64"
                 }
             else:
-                uploaded_urls = _upload_outputs_and_get_urls(final_output_paths)
                 return {
                     "success": True,
                     "message": "Advanced audio separation completed successfully",
-                    "output_urls": uploaded_urls,
+                    "output_urls": final_results,
                     "steps_completed": [
                         "Vocals/Instrumental separation",
                         "Lead/Backing vocal separation", 
@@ -417,8 +662,9 @@ def handle_advanced_separate(job_input):
 # Cold start 최적화: 컨테이너 시작 시 모델 미리 로드
 try:
     if os.getenv("PRELOAD_MODELS", "false").lower() == "true":
-        logger.info("컨테이너 시작 시 모델 미리 로드 중...")
-        load_separator()
+        logger.info("컨테이너 시작 시 파이프라인 모델 미리 로드 중...")
+        preload_separators()
+        warmup_separators()
         logger.info("Cold start 최적화 완료")
     else:
         logger.info("PRELOAD_MODELS=false: 런타임 최초 요청 시 로드")
@@ -446,4 +692,7 @@ if __name__ == "__main__":
     if os.getenv("LOCAL_TEST", "false").lower() == "true":
         test_local()
     else:
-        runpod.serverless.start({"handler": handler})
+        runpod.serverless.start({
+            "handler": handler,
+            "concurrency_modifier": lambda current_concurrency: MAX_CONCURRENCY
+        })
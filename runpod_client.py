@@ -0,0 +1,546 @@
+"""
+Audio Separator RunPod Serverless API 클라이언트
+
+RunPod Serverless에 배포된 Audio Separator API를 호출하는 클라이언트 모듈입니다.
+- runsync(동기)와 run/status(비동기 폴링)를 모두 지원
+- 서버 응답의 output 래핑을 해제하고, output_urls 또는 output_files를 저장
+- 요청 본문 생성/응답 처리 헬퍼(json_dumps, json_loads, streaming_json_body, b64_decode_to_file, AUDIO_PLACEHOLDER)는
+  로컬 서버용 클라이언트(test_client.py)와 공유하는 공개 API
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+# SIMD(AVX2/AVX-512) 가속 base64 구현 사용 (미설치 환경은 표준 라이브러리로 대체)
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+# JSON 직렬화/파싱에 orjson 사용 (미설치 환경은 표준 라이브러리로 대체)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+# 결과 파일 다운로드에 HTTP/2 사용 (httpx + h2 미설치 환경은 requests로 대체)
+try:
+    import httpx
+    import h2  # noqa: F401
+except ImportError:
+    httpx = None
+import asyncio
+import json
+import mmap
+import os
+import random
+import shutil
+import socket
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Iterator, Optional, Union
+from urllib.parse import urlparse
+
+
+# base64 스트리밍 인코딩 청크 크기 (3의 배수여야 청크 경계에 패딩 문자가 생기지 않음)
+B64_CHUNK_SIZE = 57 * 1024
+# JSON 본문에서 오디오 base64 데이터가 들어갈 자리 표시자
+AUDIO_PLACEHOLDER = "__AUDIO_DATA__"
+# JSON으로 직렬화된 자리 표시자 (본문을 이 위치에서 앞/뒤로 나눔)
+_AUDIO_PLACEHOLDER_JSON = f'"{AUDIO_PLACEHOLDER}"'.encode("utf-8")
+# base64 디코딩 청크 크기 (4의 배수여야 청크 경계가 base64 블록 경계와 일치)
+B64_DECODE_CHUNK_SIZE = 4 * 1024 * 1024
+# HTTP 연결 풀 크기 (호스트 수 및 호스트당 연결 수)
+POOL_SIZE = 32
+# 결과 파일 동시 다운로드 수
+DOWNLOAD_WORKERS = 8
+# /status 롱 폴링 대기 시간 (서버가 완료 또는 대기 시간 만료까지 응답을 보류, 미지원 시 즉시 응답)
+STATUS_LONG_POLL_SEC = 30
+# TCP keepalive 설정 (초): 유휴 후 첫 probe, probe 간격, 실패 허용 횟수
+TCP_KEEPIDLE_SEC = 30
+TCP_KEEPINTVL_SEC = 15
+TCP_KEEPCNT = 4
+# 요청 본문 gzip 압축 레벨 (네트워크 대비 CPU 비용이 작도록 가장 빠른 레벨 사용)
+GZIP_LEVEL = 1
+# 오류 응답 본문을 출력할 때 디코딩할 최대 바이트 수 (수 MB 오류 페이지 전체를 문자열로 복사하지 않도록 제한)
+ERROR_PREVIEW_BYTES = 2048
+
+
+def json_dumps(obj: Any) -> bytes:
+    """객체를 JSON bytes로 직렬화합니다."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def json_loads(data: bytes) -> Any:
+    """JSON bytes를 파싱합니다. (대용량 base64 응답에서 표준 json보다 빠름)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _preview_text(resp: requests.Response, limit: int = ERROR_PREVIEW_BYTES) -> str:
+    """응답 본문의 앞부분만 문자열로 디코딩합니다. (resp.text는 본문 전체를 디코딩하여 메모리를 두 배로 사용)"""
+    return resp.content[:limit].decode("utf-8", errors="replace")
+
+
+def _b64_chunks(path: str, chunk_size: int = B64_CHUNK_SIZE) -> Iterator[bytes]:
+    """파일을 청크 단위로 읽어 base64로 인코딩된 조각을 순서대로 반환합니다."""
+    with open(path, "rb") as f:
+        # 순차 읽기임을 커널에 알려 미리 읽기(readahead)를 늘림
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            buf = f.read(chunk_size)
+            if not buf:
+                break
+            yield base64.b64encode(buf)
+
+
+def _encode_file(path: str, size: int) -> bytes:
+    """
+    파일 전체를 base64로 인코딩합니다.
+
+    파일을 bytes로 복사하지 않고 mmap으로 매핑한 페이지를 인코더에 바로 전달합니다.
+    """
+    if size == 0:
+        return b""
+    with open(path, "rb") as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return base64.b64encode(mm)
+
+
+class _EncodeCache:
+    """
+    base64 인코딩 결과를 (경로, 수정 시각, 크기) 키로 보관하는 LRU 캐시.
+
+    같은 파일을 반복 제출할 때만 이득이므로 클라이언트에 용량을 지정한 경우에만 사용합니다.
+    보관 중인 인코딩 결과의 총 크기가 max_bytes를 넘지 않도록 오래된 항목부터 제거하며,
+    파일이 변경되면 키가 달라져 다시 인코딩됩니다.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, path: str, st: os.stat_result) -> Optional[bytes]:
+        """인코딩 결과를 반환합니다. 인코딩 결과가 캐시 용량보다 크면 None을 반환합니다. (호출 측에서 스트리밍 인코딩)"""
+        if _b64_encoded_size(st.st_size) > self.max_bytes:
+            return None
+        key = (path, st.st_mtime_ns, st.st_size)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        encoded = _encode_file(path, st.st_size)
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = encoded
+                self.total_bytes += len(encoded)
+                while self.total_bytes > self.max_bytes:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.total_bytes -= len(evicted)
+        return encoded
+
+
+class _SizedBody:
+    """
+    길이를 미리 알고 있는 스트리밍 요청 본문.
+
+    requests는 __len__이 있는 반복 가능 객체를 chunked 대신 Content-Length로 전송합니다.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], length: int):
+        self.chunks = chunks
+        self.length = length
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.chunks
+
+    def __len__(self) -> int:
+        return self.length
+
+
+def _b64_encoded_size(size: int) -> int:
+    """size 바이트를 base64로 인코딩한 결과의 길이 (패딩 포함)"""
+    return 4 * ((size + 2) // 3)
+
+
+def streaming_json_body(payload: Dict[str, Any], audio_file_path: str, encode_cache: Optional[_EncodeCache] = None) -> _SizedBody:
+    """
+    payload의 자리 표시자를 파일의 base64 인코딩으로 채운 JSON 본문을 스트리밍으로 생성합니다.
+
+    파일 전체와 인코딩 결과를 메모리에 올리지 않고 청크 단위로 전송합니다.
+    단, encode_cache가 주어지고 인코딩 결과가 캐시 용량 안에 들어가면 캐시된 결과를 재사용합니다.
+    base64 길이는 파일 크기로 미리 계산되므로 본문 전체 길이를 Content-Length로 전송합니다.
+    """
+    head, tail = json_dumps(payload).split(_AUDIO_PLACEHOLDER_JSON, 1)
+    head, tail = head + b'"', b'"' + tail
+    st = os.stat(audio_file_path)
+
+    def chunks() -> Iterator[bytes]:
+        yield head
+        encoded = encode_cache.get(audio_file_path, st) if encode_cache is not None else None
+        if encoded is not None:
+            yield encoded
+        else:
+            yield from _b64_chunks(audio_file_path)
+        yield tail
+
+    length = len(head) + _b64_encoded_size(st.st_size) + len(tail)
+    return _SizedBody(chunks(), length)
+
+
+def _gzip_chunks(chunks: Iterable[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    """본문 조각들을 gzip 형식으로 스트리밍 압축합니다."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def b64_decode_to_file(b64_data: Union[str, bytes], path: str, chunk_size: int = B64_DECODE_CHUNK_SIZE) -> str:
+    """base64 문자열을 청크 단위로 디코딩하여 파일에 바로 기록하고 저장 경로를 반환합니다. (디코딩된 전체 바이트를 메모리에 올리지 않음)"""
+    # bytes는 memoryview로 복사 없이 잘라 디코더에 전달 (str은 청크 크기만큼만 슬라이스가 복사됨)
+    if isinstance(b64_data, (bytes, bytearray)):
+        b64_data = memoryview(b64_data)
+    with open(path, "wb") as f:
+        for i in range(0, len(b64_data), chunk_size):
+            f.write(base64.b64decode(b64_data[i:i + chunk_size]))
+    return path
+
+
+def _keepalive_socket_options() -> list:
+    """기본 소켓 옵션(TCP_NODELAY)에 TCP keepalive 옵션을 더한 목록 (플랫폼에 없는 옵션은 제외)"""
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    for name, value in (
+        ("TCP_KEEPIDLE", TCP_KEEPIDLE_SEC),
+        ("TCP_KEEPINTVL", TCP_KEEPINTVL_SEC),
+        ("TCP_KEEPCNT", TCP_KEEPCNT),
+    ):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """
+    TCP keepalive를 켠 HTTPAdapter.
+
+    runsync처럼 서버 처리 동안 수 분간 유휴 상태인 연결이 NAT/로드밸런서에서 끊기지 않도록 합니다.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = _keepalive_socket_options()
+        super().init_poolmanager(*args, **kwargs)
+
+
+class AudioSeparatorRunPodClient:
+    """Audio Separator RunPod API 클라이언트"""
+
+    def __init__(self, api_url: str, api_key: str = None, encode_cache_bytes: int = 0):
+        """
+        클라이언트 초기화
+
+        Args:
+            api_url: RunPod Endpoint 기준 URL. 예시:
+              - https://api.runpod.ai/v2/<ENDPOINT_ID>
+              - 또는 기존 형식: https://api.runpod.ai/v2/<ENDPOINT_ID>/run, /runsync 중 하나
+            api_key: RunPod API 키 (선택사항)
+            encode_cache_bytes: 같은 입력 파일을 반복 제출할 때 재사용할 base64 인코딩 결과의 총 캐시 용량 (0이면 캐시하지 않고 항상 스트리밍 인코딩)
+        """
+        base = api_url.rstrip("/")
+        if base.endswith("/run") or base.endswith("/runsync") or base.endswith("/status"):
+            # 기존 형식에서 엔드포인트 베이스로 환원
+            base = base.rsplit("/", 1)[0]
+        self.base_url = base  # https://api.runpod.ai/v2/<ENDPOINT_ID>
+        self.url_run = f"{self.base_url}/run"
+        self.url_runsync = f"{self.base_url}/runsync"
+        self.url_status_base = f"{self.base_url}/status"
+
+        print(f"엔드포인트 BASE URL: {self.base_url}")
+        print(f"RUN URL: {self.url_run}")
+        print(f"RUNSYNC URL: {self.url_runsync}")
+
+        self.api_key = api_key
+        self._encode_cache = _EncodeCache(encode_cache_bytes) if encode_cache_bytes > 0 else None
+        self.session = requests.Session()
+
+        # 연결/재시도/타임아웃 설정
+        retry_strategy = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+        )
+        # 결과 파일 다운로드 시 여러 호스트/동시 연결에서도 연결이 재사용되도록 풀 크기 확장
+        adapter = _KeepAliveAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry_strategy)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # 타임아웃 기본값 (연결 10초, 응답 대기 10분: runsync는 서버 처리가 끝날 때까지 응답이 없음)
+        self.session.timeout = (10, 600)
+
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        self.session.headers.update(headers)
+
+        # 같은 CDN 호스트의 여러 결과 파일을 하나의 연결에서 다중화하여 다운로드
+        self._httpx = None
+        if httpx is not None:
+            self._httpx = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+                timeout=httpx.Timeout(600.0),
+            )
+
+    def close(self):
+        """requests 세션과 httpx 클라이언트의 연결 풀을 닫습니다."""
+        self.session.close()
+        if self._httpx is not None:
+            self._httpx.close()
+
+    def __enter__(self) -> "AudioSeparatorRunPodClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _unwrap_output(self, response_json: Dict[str, Any]) -> Dict[str, Any]:
+        """RunPod runsync/run 응답에서 output 래핑을 해제합니다."""
+        if isinstance(response_json, dict) and "output" in response_json and isinstance(response_json["output"], dict):
+            return response_json["output"]
+        return response_json
+
+    def _status_url(self, job_id: str) -> str:
+        return f"{self.url_status_base}/{job_id}"
+
+    def _wait_for_job(
+        self,
+        job_id: str,
+        poll_interval_sec: float,
+        max_wait_sec: float,
+        max_poll_interval_sec: float,
+    ) -> Dict[str, Any]:
+        """
+        작업이 끝날 때까지 /status를 폴링하고 결과를 반환합니다.
+
+        작은 GET 요청만 반복하므로 연결이 끊겨도 입력 오디오를 다시 업로드하지 않습니다.
+        """
+        # /status 롱 폴링 + 폴백 폴링 (지수 백오프 + 지터: 짧은 작업은 빨리 확인하고, 긴 작업은 요청 수를 줄임)
+        deadline = time.monotonic() + max_wait_sec
+        delay = poll_interval_sec
+        while time.monotonic() < deadline:
+            wait_sec = max(0, min(STATUS_LONG_POLL_SEC, int(deadline - time.monotonic())))
+            requested_at = time.monotonic()
+            status_resp = self.session.get(
+                self._status_url(job_id),
+                params={"wait": wait_sec * 1000},
+                timeout=wait_sec + 5,
+            )
+            # 서버가 응답을 보류했다면 이미 충분히 기다린 것이므로 곧바로 다시 요청
+            held = wait_sec > 0 and time.monotonic() - requested_at >= wait_sec / 2
+            if status_resp.status_code != 200:
+                print(f"status HTTP {status_resp.status_code}")
+            try:
+                status_json = json_loads(status_resp.content)
+            except Exception:
+                print(f"status 응답 텍스트: {_preview_text(status_resp)}")
+                return {"error": "Invalid status JSON"}
+
+            status = status_json.get("status") or status_json.get("state")
+            print(f"상태: {status}")
+            if status == "COMPLETED":
+                return self._unwrap_output(status_json)
+            if status == "FAILED":
+                return {"error": "Job failed", "details": status_json}
+
+            if held:
+                continue
+            time.sleep(delay + random.uniform(0, 0.5))
+            delay = min(delay * 2, max_poll_interval_sec)
+
+        return {"error": "Timeout waiting for job completion"}
+
+    def separate_audio(
+        self,
+        audio_file_path: Optional[str],
+        output_format: str = "WAV",
+        use_advanced: bool = False,
+        return_type: str = "url",
+        use_runsync: bool = True,
+        poll_interval_sec: float = 1.0,
+        max_wait_sec: int = 1800,
+        model_filename: str = "Kim_Vocal_1.onnx",
+        audio_url: Optional[str] = None,
+        max_poll_interval_sec: float = 30.0,
+        gzip_upload: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        오디오 분리를 수행합니다.
+
+        Args:
+            audio_file_path: 입력 오디오 파일 경로
+            output_format: 출력 형식 (WAV/FLAC/...) 
+            use_advanced: True면 4단계 고급 분리("advanced_separate"), False면 기본("separate")
+            return_type: "url"(기본) 또는 "base64"
+            use_runsync: True면 runsync 동기 처리, False면 run+status 폴링
+            poll_interval_sec: 비동기 폴링 초기 간격 (이후 max_poll_interval_sec까지 지수적으로 증가)
+            max_wait_sec: 비동기(또는 runsync 미완료 후 폴링) 최대 대기시간
+            model_filename: 사용할 모델 파일명
+            audio_url: 서버가 직접 다운로드할 입력 오디오 URL (지정 시 audio_file_path 대신 사용, base64 전송 생략)
+            max_poll_interval_sec: 비동기 폴링 최대 간격
+            gzip_upload: True면 요청 본문을 gzip으로 압축하여 전송 (Content-Encoding: gzip을 지원하는 엔드포인트에서만 사용)
+        """
+        job_type = "advanced_separate" if use_advanced else "separate"
+        payload = {
+            "input": {
+                "type": job_type,
+                "output_format": output_format,
+                "return_type": return_type,
+                "model_filename": model_filename,
+            }
+        }
+
+        if audio_url:
+            # 오디오 바이트를 요청 본문에 싣지 않고 URL만 전달
+            print(f"오디오 URL: {audio_url}")
+            payload["input"]["audio_url"] = audio_url
+            body = json_dumps(payload)
+        else:
+            # 파일 크기 안내
+            file_size = os.path.getsize(audio_file_path)
+            print(f"원본 파일 크기: {file_size} bytes ({file_size / 1024 / 1024:.2f} MB)")
+
+            # base64 인코딩은 요청 전송 중에 청크 단위로 수행
+            print(f"오디오(base64) 길이: {4 * ((file_size + 2) // 3)} chars")
+            payload["input"]["audio_data"] = AUDIO_PLACEHOLDER
+            body = streaming_json_body(payload, audio_file_path, self._encode_cache)
+
+        headers = None
+        if gzip_upload:
+            # base64 문자열은 문자당 6비트만 사용하므로 압축 시 전송량이 줄어듦
+            body = _gzip_chunks([body] if isinstance(body, bytes) else body)
+            headers = {"Content-Encoding": "gzip"}
+
+        if use_runsync:
+            print("runsync 요청 전송...")
+            resp = self.session.post(self.url_runsync, data=body, headers=headers, timeout=self.session.timeout)
+            print(f"runsync 상태: {resp.status_code}")
+            try:
+                resp_json = json_loads(resp.content)
+            except Exception:
+                print(f"응답 텍스트: {_preview_text(resp)}")
+                resp.raise_for_status()
+                return {"error": "Invalid JSON"}
+            if resp.status_code != 200:
+                return {"error": f"HTTP {resp.status_code}", "details": resp_json}
+            # runsync 대기 시간 안에 끝나지 않은 작업은 본문을 다시 보내지 않고 /status 폴링으로 이어서 대기
+            if resp_json.get("status") in ("IN_QUEUE", "IN_PROGRESS") and resp_json.get("id"):
+                print(f"작업이 아직 진행 중입니다. /status 폴링으로 전환 (작업 ID: {resp_json['id']})")
+                return self._wait_for_job(resp_json["id"], poll_interval_sec, max_wait_sec, max_poll_interval_sec)
+            # RunPod 래핑 해제
+            return self._unwrap_output(resp_json)
+        else:
+            print("run 비동기 제출...")
+            submit = self.session.post(self.url_run, data=body, headers=headers, timeout=self.session.timeout)
+            print(f"run 상태: {submit.status_code}")
+            submit.raise_for_status()
+            submit_json = json_loads(submit.content)
+            job_id = submit_json.get("id")
+            if not job_id:
+                return {"error": "No job id returned", "details": submit_json}
+            print(f"작업 ID: {job_id}")
+
+            return self._wait_for_job(job_id, poll_interval_sec, max_wait_sec, max_poll_interval_sec)
+
+    async def separate_audio_async(self, audio_file_path: Optional[str], **kwargs) -> Dict[str, Any]:
+        """
+        separate_audio의 비동기 버전입니다.
+
+        블로킹 HTTP 요청과 폴링을 워커 스레드에서 실행하므로, asyncio.gather로 여러 작업을 동시에 제출하고 기다릴 수 있습니다.
+        인자는 separate_audio와 같습니다.
+        """
+        return await asyncio.to_thread(self.separate_audio, audio_file_path, **kwargs)
+
+    def _download_one(self, item, output_dir: str) -> str:
+        """(파일명, URL) 하나를 스트리밍으로 다운로드하여 저장하고 저장 경로를 반환합니다."""
+        filename, url = item
+        print(f"다운로드: {filename} <- {url}")
+        path = os.path.join(output_dir, filename)
+        if self._httpx is not None:
+            # presigned URL은 자체 서명을 쓰므로 RunPod 인증 헤더 없이 요청
+            with self._httpx.stream("GET", url) as r:
+                r.raise_for_status()
+                with open(path, "wb") as f:
+                    for chunk in r.iter_bytes(1 << 20):
+                        f.write(chunk)
+            return path
+        # presigned URL은 자체 서명을 쓰므로 세션의 RunPod 인증 헤더는 제외
+        with self.session.get(url, timeout=600, stream=True, headers={"Authorization": None}) as r:
+            r.raise_for_status()
+            # 압축 전송된 경우에만 urllib3에서 해제 (그 외에는 소켓 바이트를 그대로 복사)
+            if r.headers.get("Content-Encoding"):
+                r.raw.decode_content = True
+            # 응답 본문 전체를 메모리에 올리지 않고 1MB 단위로 파일에 복사
+            with open(path, "wb") as f:
+                shutil.copyfileobj(r.raw, f, length=1 << 20)
+        return path
+
+    def save_outputs(self, response_data: Dict[str, Any], output_dir: str = ".") -> bool:
+        """output_files(base64) 또는 output_urls(URL) 저장"""
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            saved_any = False
+
+            futures = []
+            # 결과 파일은 서로 독립적이므로 URL 다운로드와 base64 디코딩/쓰기를 한 스레드 풀에서 함께 병렬 처리
+            with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+                # URL 저장 (공유 세션 위에서 다운로드)
+                if "output_urls" in response_data and isinstance(response_data["output_urls"], dict):
+                    for item in response_data["output_urls"].items():
+                        futures.append(executor.submit(self._download_one, item, output_dir))
+
+                # base64 저장
+                if "output_files" in response_data and isinstance(response_data["output_files"], dict):
+                    for filename, b64data in response_data["output_files"].items():
+                        path = os.path.join(output_dir, filename)
+                        futures.append(executor.submit(b64_decode_to_file, b64data, path))
+
+                for future in futures:
+                    print(f"파일 저장됨: {future.result()}")
+                    saved_any = True
+
+            if not saved_any:
+                print("저장할 출력이 없습니다. (output_urls/output_files 없음)")
+                return False
+            return True
+        except Exception as e:
+            print(f"파일 저장 실패: {e}")
+            return False
+
+    def test_connection(self) -> Dict[str, Any]:
+        """서버 연결을 테스트합니다. runsync로 'list_models' 요청."""
+        try:
+            payload = {"input": {"type": "list_models"}}
+            r = self.session.post(self.url_runsync, data=json_dumps(payload), timeout=30)
+            try:
+                j = json_loads(r.content)
+            except Exception:
+                j = {"text": _preview_text(r)}
+            return {"status_code": r.status_code, "response": j}
+        except Exception as e:
+            return {"error": str(e)}
@@ -6,36 +6,109 @@ Audio Separator RunPod Serverless API 테스트 클라이언트
 """
 
 import requests
-import base64
-import json
+from requests.adapters import HTTPAdapter
+import atexit
 import os
+import re
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
 
+# 요청 본문 스트리밍 인코딩/응답 디코딩 헬퍼는 RunPod 클라이언트 모듈과 공유
+from runpod_client import POOL_SIZE, AUDIO_PLACEHOLDER, b64_decode_to_file, json_dumps, json_loads, streaming_json_body
+
+# 출력 파일 동시 저장 수
+SAVE_WORKERS = 4
+# 모델 목록 응답 캐시 파일 (ETag 조건부 요청에 사용)
+MODELS_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "audio_separator", "models.json")
+
+def _create_session() -> requests.Session:
+    """연결 풀 크기를 확장한 HTTP 세션을 생성합니다."""
+    session = requests.Session()
+    # 반복 요청 시 TCP/TLS 연결이 재사용되도록 연결 풀 크기 확장
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# 모든 클라이언트가 공유하는 모듈 단위 세션 (프로세스 종료 시 연결 정리)
+_SESSION = _create_session()
+atexit.register(_SESSION.close)
+
+def _load_models_cache(url: str) -> Optional[Dict[str, Any]]:
+    """같은 URL에 대한 모델 목록 캐시를 읽습니다. (없거나 손상된 경우 None)"""
+    try:
+        with open(MODELS_CACHE_PATH, "rb") as f:
+            cache = json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+    return cache if cache.get("url") == url else None
+
+def _save_models_cache(cache: Dict[str, Any]):
+    """모델 목록 캐시를 원자적으로 기록합니다. (실패해도 조회 결과에는 영향 없음)"""
+    try:
+        os.makedirs(os.path.dirname(MODELS_CACHE_PATH), exist_ok=True)
+        tmp_path = f"{MODELS_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json_dumps(cache))
+        os.replace(tmp_path, MODELS_CACHE_PATH)
+    except OSError as e:
+        print(f"모델 목록 캐시 저장 실패: {e}")
+
+def _parse_max_age(cache_control: str) -> int:
+    """Cache-Control 헤더의 max-age 값(초)을 반환합니다. (no-cache/no-store이거나 없으면 0)"""
+    if re.search(r"no-(cache|store)", cache_control):
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else 0
+
 class AudioSeparatorClient:
     """Audio Separator API 클라이언트"""
     
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, session: Optional[requests.Session] = None):
         """
         클라이언트 초기화
         
         Args:
             base_url: API 기본 URL (예: https://your-endpoint.runpod.net)
+            session: 사용할 HTTP 세션 (기본값: 모듈 공유 세션)
         """
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
+        self.session = session if session is not None else _SESSION
     
     def get_models(self) -> Dict[str, Any]:
         """
         사용 가능한 모델 목록을 조회합니다.
+
+        응답은 MODELS_CACHE_PATH에 ETag와 함께 캐시되며, Cache-Control max-age 동안은 요청 없이 캐시를 반환하고
+        그 이후에는 If-None-Match 조건부 요청으로 변경 여부만 확인합니다. (304 응답 시 본문 전송 없음)
         
         Returns:
             API 응답 데이터
         """
+        url = f"{self.base_url}/api/models"
+        cache = _load_models_cache(url)
+        if cache and time.time() - cache["fetched_at"] < cache.get("max_age", 0):
+            return cache["body"]
+
+        headers = {}
+        if cache and cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
         try:
-            response = self.session.get(f"{self.base_url}/api/models")
+            response = self.session.get(url, headers=headers)
+            if response.status_code == 304 and cache:
+                cache["fetched_at"] = time.time()
+                cache["max_age"] = _parse_max_age(response.headers.get("Cache-Control", ""))
+                _save_models_cache(cache)
+                return cache["body"]
             response.raise_for_status()
-            return response.json()
+            body = json_loads(response.content)
+            etag = response.headers.get("ETag")
+            max_age = _parse_max_age(response.headers.get("Cache-Control", ""))
+            if etag or max_age:
+                _save_models_cache({"url": url, "etag": etag, "max_age": max_age, "fetched_at": time.time(), "body": body})
+            return body
         except requests.exceptions.RequestException as e:
             print(f"모델 목록 조회 실패: {e}")
             return {"error": str(e)}
@@ -45,7 +118,8 @@ class AudioSeparatorClient:
         audio_file_path: str,
         model_filename: str = "model_bs_roformer_ep_317_sdr_12.9755.ckpt",
         output_format: str = "WAV",
-        custom_output_names: Optional[Dict[str, str]] = None
+        custom_output_names: Optional[Dict[str, str]] = None,
+        return_type: str = "base64"
     ) -> Dict[str, Any]:
         """
         오디오 파일을 분리합니다.
@@ -55,20 +129,23 @@ class AudioSeparatorClient:
             model_filename: 사용할 모델 파일명
             output_format: 출력 형식
             custom_output_names: 출력 파일명 커스터마이징
+            return_type: "base64"(기본, output_files에 본문 포함) 또는 "url"(output_urls로 결과 파일 URL 반환)
+                "url"은 서버가 output_urls를 반환하는 경우에만 사용 (/api 서버는 base64만 반환할 수 있음)
             
         Returns:
             API 응답 데이터
         """
         try:
-            # 오디오 파일을 base64로 인코딩
-            with open(audio_file_path, "rb") as f:
-                audio_data = base64.b64encode(f.read()).decode('utf-8')
+            # 파일 존재 확인 (base64 인코딩은 요청 전송 중에 청크 단위로 수행)
+            if not os.path.isfile(audio_file_path):
+                raise FileNotFoundError(audio_file_path)
             
             # 요청 데이터 구성
             request_data = {
-                "audio_data": audio_data,
+                "audio_data": AUDIO_PLACEHOLDER,
                 "model_filename": model_filename,
-                "output_format": output_format
+                "output_format": output_format,
+                "return_type": return_type
             }
             
             if custom_output_names:
@@ -77,11 +154,11 @@ class AudioSeparatorClient:
             # API 호출
             response = self.session.post(
                 f"{self.base_url}/api/separate",
-                json=request_data,
+                data=streaming_json_body(request_data, audio_file_path),
                 headers={"Content-Type": "application/json"}
             )
             response.raise_for_status()
-            return response.json()
+            return json_loads(response.content)
             
         except FileNotFoundError:
             print(f"오디오 파일을 찾을 수 없습니다: {audio_file_path}")
@@ -93,9 +170,22 @@ class AudioSeparatorClient:
             print(f"예상치 못한 오류: {e}")
             return {"error": str(e)}
     
+    def _download_to_file(self, url: str, output_path: str) -> str:
+        """결과 파일 URL을 스트리밍으로 다운로드하여 저장하고 저장 경로를 반환합니다."""
+        with self.session.get(url, timeout=600, stream=True) as response:
+            response.raise_for_status()
+            # 응답 본문 전체를 메모리에 올리지 않고 1MB 단위로 파일에 기록
+            with open(output_path, "wb") as f:
+                for chunk in response.iter_content(1 << 20):
+                    f.write(chunk)
+        return output_path
+    
     def save_output_files(self, response_data: Dict[str, Any], output_dir: str = ".") -> bool:
         """
         API 응답에서 출력 파일들을 저장합니다.
+
+        요청한 return_type과 관계없이 서버가 실제로 반환한 형태를 따릅니다.
+        (output_urls가 있으면 다운로드, output_files가 있으면 base64 디코딩)
         
         Args:
             response_data: API 응답 데이터
@@ -105,19 +195,24 @@ class AudioSeparatorClient:
             성공 여부
         """
         try:
-            if "output_files" not in response_data:
+            if "output_urls" not in response_data and "output_files" not in response_data:
                 print("출력 파일이 응답에 없습니다.")
                 return False
             
             # 출력 디렉토리 생성
             os.makedirs(output_dir, exist_ok=True)
             
-            # 각 출력 파일 저장
-            for filename, file_data in response_data["output_files"].items():
-                output_path = os.path.join(output_dir, filename)
-                with open(output_path, "wb") as f:
-                    f.write(base64.b64decode(file_data))
-                print(f"파일 저장됨: {output_path}")
+            # 각 출력 파일의 다운로드 또는 디코딩/쓰기를 병렬로 수행 (디스크 I/O 대기 중에도 다른 파일 처리)
+            with ThreadPoolExecutor(max_workers=SAVE_WORKERS) as executor:
+                futures = []
+                for filename, url in response_data.get("output_urls", {}).items():
+                    output_path = os.path.join(output_dir, filename)
+                    futures.append(executor.submit(self._download_to_file, url, output_path))
+                for filename, file_data in response_data.get("output_files", {}).items():
+                    output_path = os.path.join(output_dir, filename)
+                    futures.append(executor.submit(b64_decode_to_file, file_data, output_path))
+                for future in futures:
+                    print(f"파일 저장됨: {future.result()}")
             
             return True
             
@@ -172,7 +267,7 @@ def main():
     
     print("오디오 분리 완료!")
     print(f"사용된 모델: {separation_response.get('model_used', 'Unknown')}")
-    print(f"출력 파일 수: {len(separation_response.get('output_files', {}))}")
+    print(f"출력 파일 수: {len(separation_response.get('output_urls', {})) + len(separation_response.get('output_files', {}))}")
     print()
     
     # 3. 결과 파일 저장
@@ -1,57 +1,122 @@
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import librosa
+import numpy as np
 from audio_separator.separator import Separator
 
 # 입력값 설정
-input_audio_path = "sample.mp3"  # 테스트할 로컬 오디오 파일 경로
-output_dir = "outputs/test_uvr"     # 출력 디렉토리
-
-os.makedirs(output_dir, exist_ok=True)
-
-# 출력 파일명 정의
-vocals_path = os.path.join(output_dir, 'Vocals.wav')
-instrumental_path = os.path.join(output_dir, 'Instrumental.wav')
-lead_vocals_path = os.path.join(output_dir, 'Lead_Vocals.wav')
-backing_vocals_path = os.path.join(output_dir, 'Backing_Vocals.wav')
-lead_vocals_reverb_path = os.path.join(output_dir, 'Vocals_Reverb.wav')
-lead_vocals_no_reverb_path = os.path.join(output_dir, 'Vocals_No_Reverb.wav')
-lead_vocals_noise_path = os.path.join(output_dir, 'Vocals_Noise.wav')
-lead_vocals_no_noise_path = os.path.join(output_dir, 'Vocals_No_Noise.wav')
-
-# Separator 초기화
-separator = Separator(output_dir=output_dir)
-
-# Step 1: Vocals / Instrumental 분리
-print("[Step 1] Vocals / Instrumental 분리")
-try:
-    separator.load_model("Kim_Vocal_1.onnx")
-except Exception as e:
-    print(f"[!] Kim_Vocal_1.onnx 로드 실패 → 대체 모델 사용: {e}")
-    separator.load_model("UVR_MDXNET_KARA.onnx")
-voc_inst = separator.separate(input_audio_path)
-
-# 이름 통일
-os.rename(os.path.join(output_dir, voc_inst[0]), instrumental_path)
-os.rename(os.path.join(output_dir, voc_inst[1]), vocals_path)
-
-# Step 2: Lead / Backing Vocal 분리
-print("[Step 2] Lead / Backing Vocal 분리")
-separator.load_model("UVR_MDXNET_KARA.onnx")
-backing_voc = separator.separate(vocals_path)
-os.rename(os.path.join(output_dir, backing_voc[0]), backing_vocals_path)
-os.rename(os.path.join(output_dir, backing_voc[1]), lead_vocals_path)
-
-# Step 3: DeReverb (잔향 제거)
-print("[Step 3] DeReverb 처리")
-separator.load_model("UVR-De-Echo-Aggressive.pth")
-voc_no_reverb = separator.separate(lead_vocals_path)
-os.rename(os.path.join(output_dir, voc_no_reverb[0]), lead_vocals_no_reverb_path)
-os.rename(os.path.join(output_dir, voc_no_reverb[1]), lead_vocals_reverb_path)
-
-# Step 4: Denoise (노이즈 제거)
-print("[Step 4] Denoise 처리")
-separator.load_model("UVR-DeNoise.pth")
-voc_no_noise = separator.separate(lead_vocals_no_reverb_path)
-os.rename(os.path.join(output_dir, voc_no_noise[0]), lead_vocals_noise_path)
-os.rename(os.path.join(output_dir, voc_no_noise[1]), lead_vocals_no_noise_path)
-
-print("\n✅ 모든 처리가 완료되었습니다. 결과 경로:", output_dir)
+input_audio_paths = sys.argv[1:] or ["sample.mp3"]  # 테스트할 로컬 오디오 파일 경로 (여러 개 지정 가능)
+output_root = "outputs/test_uvr"     # 출력 디렉토리 (입력 파일별 하위 디렉토리에 저장)
+
+# 모델 파일 디렉토리 (Separator 기본값과 동일, 환경변수로 변경 가능)
+MODEL_FILE_DIR = os.environ.get("MODEL_FILE_DIR", "/tmp/audio-separator-models/")
+
+# 한 번의 추론에 묶어 실행할 청크 수 (청크별 커널 실행/디스패치 오버헤드를 줄임, GPU 메모리에 맞게 조정)
+MDX_BATCH_SIZE = int(os.environ.get("MDX_BATCH_SIZE", "4"))
+VR_BATCH_SIZE = int(os.environ.get("VR_BATCH_SIZE", "16"))
+
+# 파이프라인에서 사용하는 모델 (Step 1 대체 모델인 KARA는 Step 2에서도 사용)
+MODEL_FILENAMES = [
+    "Kim_Vocal_1.onnx",
+    "UVR_MDXNET_KARA.onnx",
+    "UVR-De-Echo-Aggressive.pth",
+    "UVR-DeNoise.pth",
+]
+
+
+def get_stem(stems, stem_name):
+    """separate_array 결과에서 stem 이름으로 배열을 찾습니다. (대소문자 무시)"""
+    return {name.lower(): source for name, source in stems.items()}[stem_name.lower()]
+
+
+class Pipeline:
+    """
+    4단계 UVR 분리 파이프라인.
+
+    모델은 생성 시 한 번만 (병렬로) 로드하고, 이후 run()으로 여러 파일을 처리하는 동안 재사용합니다.
+    """
+
+    def __init__(self):
+        # 모델 파일과 공유 메타데이터(download_checks.json, 모델 데이터 json)는 먼저 순차로 다운로드
+        # (download_file_if_not_exists는 잠금 없이 존재 확인 후 쓰므로 병렬 로드가 같은 파일을 동시에 쓰면 파일이 깨질 수 있음)
+        downloader = Separator(model_file_dir=MODEL_FILE_DIR, info_only=True)
+        for model_filename in MODEL_FILENAMES:
+            try:
+                downloader.download_model_and_data(model_filename)
+            except Exception as e:
+                # 실패한 모델은 아래 로드 단계에서 다시 실패하며, Step 1은 대체 모델로 진행
+                print(f"[!] {model_filename} 다운로드 실패: {e}")
+
+        # 이후 세션 생성 등 모델 초기화만 병렬로 수행하여 각 단계 모델 로딩을 이전 단계 연산 뒤로 숨김
+        self.executor = ThreadPoolExecutor(max_workers=len(MODEL_FILENAMES))
+        self.separator_futures = {model_filename: self.executor.submit(self.load_separator, model_filename) for model_filename in MODEL_FILENAMES}
+
+    @staticmethod
+    def load_separator(model_filename):
+        """model_filename 모델이 로드된 Separator 인스턴스를 생성합니다."""
+        # use_autocast: GPU에서 VR(torch) 모델을 FP16 혼합 정밀도로 실행 (handler와 동일)
+        instance = Separator(
+            model_file_dir=MODEL_FILE_DIR,
+            output_dir=output_root,
+            use_autocast=True,
+            mdx_params={"hop_length": 1024, "segment_size": 256, "overlap": 0.25, "batch_size": MDX_BATCH_SIZE, "enable_denoise": False},
+            vr_params={"batch_size": VR_BATCH_SIZE, "window_size": 512, "aggression": 5, "enable_tta": False, "enable_post_process": False, "post_process_threshold": 0.2, "high_end_process": False, "quantize_int8": False},
+        )
+        instance.load_model(model_filename)
+        return instance
+
+    def get_separator(self, model_filename, output_dir):
+        """model_filename 모델이 로드된 Separator 인스턴스를 output_dir에 저장하도록 설정하여 반환합니다. (로드 중이면 완료까지 대기)"""
+        separator = self.separator_futures[model_filename].result()
+        separator.output_dir = output_dir
+        separator.model_instance.output_dir = output_dir
+        return separator
+
+    def run(self, input_audio_path, output_dir):
+        """input_audio_path에 4단계 분리를 수행하고 결과를 output_dir에 저장합니다."""
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Step 1: Vocals / Instrumental 분리
+        print("[Step 1] Vocals / Instrumental 분리")
+        # 입력은 한 번만 디코딩하고, 이후 단계는 이전 단계 stem 배열을 바로 전달 (중간 WAV 재디코딩 없음, 모델 로딩과 병행)
+        mix, _ = librosa.load(input_audio_path, sr=44100, mono=False)
+        if mix.ndim == 1:
+            mix = [mix, mix]
+        try:
+            separator = self.get_separator("Kim_Vocal_1.onnx", output_dir)
+        except Exception as e:
+            print(f"[!] Kim_Vocal_1.onnx 로드 실패 → 대체 모델 사용: {e}")
+            separator = self.get_separator("UVR_MDXNET_KARA.onnx", output_dir)
+        # 출력 파일명을 stem 이름으로 바로 지정 (분리 후 이름 변경 불필요)
+        voc_inst = separator.separate_array(np.asarray(mix).T, custom_output_names={"Vocals": "Vocals", "Instrumental": "Instrumental"})
+
+        # Step 2: Lead / Backing Vocal 분리
+        print("[Step 2] Lead / Backing Vocal 분리")
+        separator = self.get_separator("UVR_MDXNET_KARA.onnx", output_dir)
+        backing_voc = separator.separate_array(get_stem(voc_inst, "Vocals"), custom_output_names={"Vocals": "Lead_Vocals", "Instrumental": "Backing_Vocals"})
+
+        # Step 3: DeReverb (잔향 제거)
+        print("[Step 3] DeReverb 처리")
+        separator = self.get_separator("UVR-De-Echo-Aggressive.pth", output_dir)
+        voc_no_reverb = separator.separate_array(get_stem(backing_voc, "Vocals"), custom_output_names={"No Echo": "Vocals_No_Reverb", "Echo": "Vocals_Reverb"})
+
+        # Step 4: Denoise (노이즈 제거)
+        print("[Step 4] Denoise 처리")
+        separator = self.get_separator("UVR-DeNoise.pth", output_dir)
+        separator.separate_array(get_stem(voc_no_reverb, "No Echo"), custom_output_names={"Noise": "Vocals_Noise", "No Noise": "Vocals_No_Noise"})
+
+    def close(self):
+        self.executor.shutdown()
+
+
+pipeline = Pipeline()
+for input_audio_path in input_audio_paths:
+    # 출력 파일명이 고정이므로 입력 파일별 디렉토리에 저장
+    output_dir = os.path.join(output_root, os.path.splitext(os.path.basename(input_audio_path))[0])
+    print(f"\n▶ 처리 중: {input_audio_path}")
+    pipeline.run(input_audio_path, output_dir)
+    print(f"✅ 처리 완료. 결과 경로: {output_dir}")
+pipeline.close()
+
+print("\n✅ 모든 처리가 완료되었습니다. 결과 경로:", output_root)
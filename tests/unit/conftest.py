@@ -0,0 +1,35 @@
+import logging
+import pytest
+import torch
+from unittest.mock import Mock
+from audio_separator.separator import Separator
+
+
+@pytest.fixture
+def common_config():
+    """Base config for CommonSeparator and the architecture separators, with the keys Separator.load_model passes"""
+    return {
+        "logger": Mock(),
+        "log_level": logging.INFO,
+        "torch_device": torch.device("cpu"),
+        "onnx_execution_provider": ["CPUExecutionProvider"],
+        "model_name": "model",
+        "model_path": "model.onnx",
+        "model_data": {},
+        "output_dir": None,
+        "output_format": "WAV",
+        "normalization_threshold": 0.9,
+        "amplification_threshold": 0.0,
+        "sample_rate": 44100,
+        "use_soundfile": True,
+    }
+
+
+@pytest.fixture
+def separator_factory(tmp_path):
+    """Creates info_only Separators (no model loaded, nothing downloaded) using a temporary model directory"""
+
+    def create_separator(**kwargs):
+        return Separator(info_only=True, model_file_dir=str(tmp_path), **kwargs)
+
+    return create_separator
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from audio_separator.separator.common_separator import CommonSeparator
+
+
+@pytest.fixture
+def common_separator(common_config):
+    return CommonSeparator(common_config)
+
+
+@pytest.fixture
+def stem_source():
+    return np.full((44100, 2), 0.5, dtype=np.float32)
+
+
+@pytest.fixture
+def mix():
+    return np.zeros((88200, 2), dtype=np.float32)
+
+
+@pytest.mark.parametrize("stem_path", ["audio_(Vocals).wav", "audio_(Vocals).FLAC"])
+def test_write_audio_uses_soundfile_for_wav_and_flac(common_separator, mix, stem_source, stem_path):
+    common_separator.audio_file_path = mix
+
+    with patch.object(common_separator, "write_audio_soundfile") as write_soundfile, patch.object(common_separator, "write_audio_pydub") as write_pydub:
+        common_separator.write_audio(stem_path, stem_source)
+
+    write_soundfile.assert_called_once_with(stem_path, stem_source)
+    write_pydub.assert_not_called()
+
+
+def test_write_audio_uses_pydub_for_formats_soundfile_cannot_write(common_separator, mix, stem_source):
+    common_separator.audio_file_path = mix
+
+    with patch.object(common_separator, "write_audio_soundfile") as write_soundfile, patch.object(common_separator, "write_audio_pydub") as write_pydub:
+        common_separator.write_audio("audio_(Vocals).m4a", stem_source)
+
+    write_pydub.assert_called_once_with("audio_(Vocals).m4a", stem_source)
+    write_soundfile.assert_not_called()
+
+
+def test_write_audio_soundfile_failure_is_raised(common_separator, stem_source):
+    with patch("audio_separator.separator.common_separator.sf.write", side_effect=RuntimeError("write failed")):
+        with pytest.raises(RuntimeError):
+            common_separator.write_audio_soundfile("audio_(Vocals).wav", stem_source)
+
+
+def test_audio_file_base_for_array_input(common_separator, mix):
+    assert common_separator.get_audio_file_base(mix) == "audio"
+    assert common_separator.get_audio_file_base("/tmp/song.name.mp3") == "song.name"
+
+
+def test_write_audio_duration_from_array_shape(common_separator, mix):
+    common_separator.audio_file_path = mix
+
+    with patch.object(common_separator, "write_audio_soundfile"), patch("audio_separator.separator.common_separator.librosa.get_duration") as get_duration:
+        common_separator.write_audio("audio_(Vocals).wav", mix)
+
+    get_duration.assert_not_called()
+    common_separator.logger.info.assert_any_call("Audio duration is 0.00 hours (2.00 seconds).")
+
+
+def test_stem_output_path_for_array_input(common_separator, mix):
+    common_separator.audio_file_base = common_separator.get_audio_file_base(mix)
+
+    assert common_separator.get_stem_output_path("Vocals", None) == "audio_(Vocals)_model.wav"
+    assert common_separator.get_stem_output_path("Vocals", {"VOCALS": "Lead/Vocals"}) == "Lead_Vocals.wav"
@@ -0,0 +1,130 @@
+import ctypes
+import numpy as np
+import onnx
+import onnxruntime as ort
+import pytest
+import torch
+from onnx import TensorProto, helper
+from unittest.mock import Mock, patch
+from audio_separator.separator.architectures.mdx_separator import MDXSeparator
+
+N_FFT = 512
+DIM_F = 256
+DIM_T_SET = 4  # dim_t = 2 ** 4 = 16 frames per chunk
+HOP_LENGTH = 128
+
+
+def save_mock_model(path):
+    """Saves a tiny ONNX model standing in for an MDX network: it scales the input spectrogram, keeping its (dynamic batch) shape"""
+    spec_shape = ["batch", 4, DIM_F, 2**DIM_T_SET]
+    graph = helper.make_graph(
+        [helper.make_node("Mul", ["input", "scale"], ["output"])],
+        "mock_mdx",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, spec_shape)],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, spec_shape)],
+        [helper.make_tensor("scale", TensorProto.FLOAT, [], [0.5])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+@pytest.fixture
+def mock_model_path(tmp_path):
+    model_path = str(tmp_path / "mock_mdx.onnx")
+    save_mock_model(model_path)
+    return model_path
+
+
+@pytest.fixture
+def create_mdx_separator(common_config, mock_model_path):
+    """Creates MDXSeparators for the mock model with the given batch size, on the CPU unless another device is given"""
+
+    def create(batch_size, torch_device="cpu", onnx_execution_provider=("CPUExecutionProvider",)):
+        config = {
+            **common_config,
+            "torch_device": torch.device(torch_device),
+            "onnx_execution_provider": list(onnx_execution_provider),
+            "model_name": "mock_mdx",
+            "model_path": mock_model_path,
+            "model_data": {"compensate": 1.0, "mdx_dim_f_set": DIM_F, "mdx_dim_t_set": DIM_T_SET, "mdx_n_fft_scale_set": N_FFT, "primary_stem": "Vocals"},
+        }
+        arch_config = {"segment_size": 2**DIM_T_SET, "overlap": 0.25, "batch_size": batch_size, "hop_length": HOP_LENGTH, "enable_denoise": False}
+        return MDXSeparator(config, arch_config)
+
+    return create
+
+
+@pytest.fixture
+def mix():
+    # Long enough for several chunks, including a shorter final chunk that is zero-padded within its batch
+    rng = np.random.default_rng(0)
+    return rng.uniform(-0.5, 0.5, size=(2, 10000)).astype(np.float32)
+
+
+class HostIOBinding:
+    """Stands in for an ONNXruntime CUDA IO binding: reads and writes the bound buffers by pointer, running the session on the host"""
+
+    def __init__(self, session):
+        self.session = session
+        self.bindings = {}
+        self.batch_sizes = []
+
+    def bind_input(self, name, device_type, device_id, element_type, shape, buffer_ptr):
+        self.bindings["input"] = (name, shape, buffer_ptr)
+
+    def bind_output(self, name, device_type, device_id, element_type, shape, buffer_ptr):
+        self.bindings["output"] = (name, shape, buffer_ptr)
+
+    def run(self):
+        input_name, input_shape, input_ptr = self.bindings["input"]
+        _, output_shape, output_ptr = self.bindings["output"]
+        spek = np.ctypeslib.as_array(ctypes.cast(input_ptr, ctypes.POINTER(ctypes.c_float)), shape=input_shape).copy()
+        spec_pred = np.ascontiguousarray(self.session.run(None, {input_name: spek})[0], dtype=np.float32)
+        if spec_pred.shape != tuple(output_shape):
+            raise ValueError(f"Output shape {spec_pred.shape} does not match bound shape {output_shape}")
+        ctypes.memmove(output_ptr, spec_pred.ctypes.data, spec_pred.nbytes)
+        self.batch_sizes.append(input_shape[0])
+
+
+@pytest.mark.parametrize("batch_size", [2, 3, 16])
+def test_batched_demix_matches_unbatched(create_mdx_separator, mix, batch_size):
+    unbatched_source = create_mdx_separator(batch_size=1).demix(mix)
+    assert not np.isnan(unbatched_source).any()
+
+    batched_source = create_mdx_separator(batch_size=batch_size).demix(mix)
+    assert batched_source.shape == mix.shape
+    np.testing.assert_allclose(batched_source, unbatched_source, rtol=1e-5, atol=1e-6, equal_nan=False)
+
+
+def test_batched_match_mix_demix_matches_unbatched(create_mdx_separator, mix):
+    unbatched_source = create_mdx_separator(batch_size=1).demix(mix, is_match_mix=True)
+    batched_source = create_mdx_separator(batch_size=4).demix(mix, is_match_mix=True)
+
+    np.testing.assert_allclose(batched_source, unbatched_source, rtol=1e-5, atol=1e-6, equal_nan=False)
+
+
+def test_io_binding_demix_matches_session_run(create_mdx_separator, mock_model_path, mix):
+    expected_source = create_mdx_separator(batch_size=1).demix(mix)
+
+    # Run the IO binding path on host memory, so the binding of batched input/output buffers is checked without a GPU
+    separator = create_mdx_separator(batch_size=4)
+    session = ort.InferenceSession(mock_model_path, providers=["CPUExecutionProvider"])
+    io_binding = HostIOBinding(session)
+    mock_session = Mock(io_binding=Mock(return_value=io_binding), get_outputs=session.get_outputs, run_with_iobinding=lambda binding: binding.run())
+    separator.model_run = lambda spek: separator.run_onnx_with_io_binding(mock_session, spek)
+
+    with patch("torch.cuda.current_stream"):
+        source = separator.demix(mix)
+
+    # 9 chunks are run as two full batches and one partial batch
+    assert io_binding.batch_sizes == [4, 4, 1]
+    np.testing.assert_allclose(source, expected_source, rtol=1e-5, atol=1e-6, equal_nan=False)
+
+
+@pytest.mark.skipif(not (torch.cuda.is_available() and "CUDAExecutionProvider" in ort.get_available_providers()), reason="CUDA not available")
+def test_io_binding_demix_matches_cpu(create_mdx_separator, mix):
+    cpu_source = create_mdx_separator(batch_size=1).demix(mix)
+    cuda_source = create_mdx_separator(batch_size=4, torch_device="cuda", onnx_execution_provider=("CUDAExecutionProvider",)).demix(mix)
+
+    np.testing.assert_allclose(cuda_source, cpu_source, rtol=1e-4, atol=1e-5)
@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from audio_separator.separator.common_separator import CommonSeparator
+from audio_separator.separator.architectures.demucs_separator import DemucsSeparator
+from audio_separator.separator.architectures.mdx_separator import MDXSeparator
+
+
+class FakeStemSeparator(CommonSeparator):
+    """Writes one scaled copy of the input per stem name, the way the architecture classes call final_process"""
+
+    def __init__(self, common_config, stem_names):
+        super().__init__({**common_config, "model_name": "fake_model", "model_data": {"training": {"instruments": stem_names}}})
+        self.stem_names = stem_names
+
+    def separate(self, audio_file_path, custom_output_names=None):
+        self.audio_file_path = audio_file_path
+        self.audio_file_base = self.get_audio_file_base(audio_file_path)
+
+        output_files = []
+        for index, stem_name in enumerate(self.stem_names):
+            source = audio_file_path * (index + 1)
+            if index == 0:
+                self.primary_source = source
+            elif index == 1:
+                self.secondary_source = source
+            stem_path = self.get_stem_output_path(stem_name, custom_output_names)
+            self.final_process(stem_path, source, stem_name)
+            output_files.append(stem_path)
+        return output_files
+
+
+@pytest.fixture
+def mix():
+    return np.full((44100, 2), 0.1, dtype=np.float32)
+
+
+@pytest.fixture
+def separator(separator_factory, common_config):
+    # info_only skips hardware setup, which separate_array needs to have run
+    separator = separator_factory()
+    separator.torch_device = common_config["torch_device"]
+    return separator
+
+
+@pytest.fixture
+def separate_array(separator, common_config, mix):
+    """Runs Separator.separate_array with a FakeStemSeparator for the given stems, returning the stems and the mocked write_audio"""
+
+    def run(stem_names, custom_output_names=None):
+        separator.model_instance = FakeStemSeparator(common_config, stem_names)
+        with patch.object(CommonSeparator, "write_audio") as write_audio:
+            stems = separator.separate_array(mix, custom_output_names=custom_output_names)
+        return separator, stems, write_audio
+
+    return run
+
+
+def test_separate_array_two_stem_model_returns_both_stems(separate_array, mix):
+    _, stems, write_audio = separate_array(["Vocals", "Instrumental"])
+
+    assert set(stems) == {"Vocals", "Instrumental"}
+    np.testing.assert_array_equal(stems["Vocals"], mix)
+    np.testing.assert_array_equal(stems["Instrumental"], mix * 2)
+    assert [call.args[0] for call in write_audio.call_args_list] == ["audio_(Vocals)_fake_model.wav", "audio_(Instrumental)_fake_model.wav"]
+
+
+def test_separate_array_multi_stem_model_returns_all_written_stems(separate_array, mix):
+    _, stems, _ = separate_array(["Vocals", "Drums", "Bass", "Other"])
+
+    assert set(stems) == {"Vocals", "Drums", "Bass", "Other"}
+    np.testing.assert_array_equal(stems["Other"], mix * 4)
+
+
+def test_separate_array_custom_output_names_apply_to_written_files(separate_array):
+    _, stems, write_audio = separate_array(["Vocals", "Instrumental"], custom_output_names={"vocals": "Lead_Vocals"})
+
+    # Stems stay keyed by stem name; only the output file names change
+    assert set(stems) == {"Vocals", "Instrumental"}
+    assert [call.args[0] for call in write_audio.call_args_list] == ["Lead_Vocals.wav", "audio_(Instrumental)_fake_model.wav"]
+
+
+def test_separate_array_clears_stems_after_separation(separate_array):
+    separator, _, _ = separate_array(["Vocals", "Instrumental"])
+
+    assert separator.model_instance.processed_stems == {}
+    assert separator.model_instance.primary_source is None
+
+
+def test_separate_array_rejects_demucs_model(separator, mix):
+    separator.model_instance = DemucsSeparator.__new__(DemucsSeparator)
+
+    with pytest.raises(ValueError):
+        separator.separate_array(mix)
+
+
+ORT_PROVIDERS = ["TensorrtExecutionProvider", "CUDAExecutionProvider", "CPUExecutionProvider"]
+
+
+def test_cuda_provider_uses_same_as_requested_arena(separator_factory):
+    separator = separator_factory()
+    separator.configure_cuda(ORT_PROVIDERS)
+
+    assert separator.onnx_execution_provider == [("CUDAExecutionProvider", {"arena_extend_strategy": "kSameAsRequested"})]
+
+
+def test_cuda_provider_gpu_mem_limit(separator_factory):
+    separator = separator_factory(onnx_gpu_mem_limit=2 << 30)
+    separator.configure_cuda(ORT_PROVIDERS)
+
+    assert separator.onnx_execution_provider == [("CUDAExecutionProvider", {"arena_extend_strategy": "kSameAsRequested", "gpu_mem_limit": 2 << 30})]
+
+
+def test_tensorrt_provider_precedes_cuda_options(separator_factory):
+    separator = separator_factory(use_tensorrt=True)
+    separator.configure_cuda(ORT_PROVIDERS)
+
+    provider_names = [provider[0] if isinstance(provider, tuple) else provider for provider in separator.onnx_execution_provider]
+    assert provider_names == ["TensorrtExecutionProvider", "CUDAExecutionProvider", "CPUExecutionProvider"]
+    assert separator.onnx_execution_provider[1][1]["arena_extend_strategy"] == "kSameAsRequested"
+
+
+@pytest.mark.parametrize("onnx_gpu_mem_limit", [0, -1, 1.5, "1024", True])
+def test_invalid_gpu_mem_limit_is_rejected(separator_factory, onnx_gpu_mem_limit):
+    with pytest.raises(ValueError):
+        separator_factory(onnx_gpu_mem_limit=onnx_gpu_mem_limit)
+
+
+def test_providers_passed_to_inference_session(separator_factory, common_config):
+    separator = separator_factory(onnx_gpu_mem_limit=1 << 30)
+    separator.configure_cuda(ORT_PROVIDERS)
+
+    common_config.update(
+        torch_device=separator.torch_device,
+        onnx_execution_provider=separator.onnx_execution_provider,
+        model_data={"compensate": 1.0, "mdx_dim_f_set": 256, "mdx_dim_t_set": 4, "mdx_n_fft_scale_set": 512},
+    )
+    arch_config = {"segment_size": 16, "overlap": 0.25, "batch_size": 1, "hop_length": 128, "enable_denoise": False}
+    with patch("audio_separator.separator.architectures.mdx_separator.ort.InferenceSession") as inference_session:
+        inference_session.return_value.get_providers.return_value = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+        MDXSeparator(common_config, arch_config)
+
+    assert inference_session.call_args.kwargs["providers"] == [("CUDAExecutionProvider", {"arena_extend_strategy": "kSameAsRequested", "gpu_mem_limit": 1 << 30})]
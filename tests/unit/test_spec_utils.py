@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from audio_separator.separator.uvr_lib_v5 import spec_utils
+
+
+@pytest.fixture
+def wave():
+    rng = np.random.default_rng(0)
+    return rng.uniform(-0.5, 0.5, size=(2, 44100)).astype(np.float32)
+
+
+def assert_matches_abs_max(wave):
+    peak = spec_utils.peak_amplitude(wave)
+    expected_peak = np.abs(wave).max()
+    assert peak == expected_peak
+    assert np.asarray(peak).dtype == np.asarray(expected_peak).dtype
+
+
+def test_peak_amplitude_matches_abs_max(wave):
+    assert_matches_abs_max(wave)
+
+
+@pytest.mark.parametrize("peak", [-0.95, 0.95])
+def test_peak_amplitude_of_negative_and_positive_peaks(wave, peak):
+    wave[1, 100] = peak
+    assert spec_utils.peak_amplitude(wave) == np.float32(0.95)
+    assert_matches_abs_max(wave)
+
+
+def test_peak_amplitude_of_all_negative_wave(wave):
+    assert_matches_abs_max(-np.abs(wave))
+
+
+def test_peak_amplitude_of_all_zero_wave():
+    silent = np.zeros((2, 1000), dtype=np.float32)
+    assert spec_utils.peak_amplitude(silent) == 0.0
+    assert_matches_abs_max(silent)
+
+
+def test_peak_amplitude_of_empty_wave_raises_like_abs_max():
+    empty = np.zeros((2, 0), dtype=np.float32)
+    with pytest.raises(ValueError):
+        np.abs(empty).max()
+    with pytest.raises(ValueError):
+        spec_utils.peak_amplitude(empty)
+
+
+def test_peak_amplitude_propagates_nan_like_abs_max(wave):
+    wave[0, 10] = np.nan
+    assert np.isnan(np.abs(wave).max())
+    assert np.isnan(spec_utils.peak_amplitude(wave))
+
+
+def test_normalize_matches_abs_max_scaling(wave):
+    loud = wave * 4
+    expected = loud * (0.9 / np.abs(loud).max())
+    np.testing.assert_array_equal(spec_utils.normalize(loud.copy(), max_peak=0.9), expected)
+
+    quiet = wave * 0.01
+    expected = quiet * (0.5 / np.abs(quiet).max())
+    np.testing.assert_array_equal(spec_utils.normalize(quiet.copy(), max_peak=0.9, min_peak=0.5), expected)
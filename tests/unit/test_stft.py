@@ -137,6 +137,19 @@ class TestSTFT(unittest.TestCase):
         # Check if the output tensor has the expected shape
         self.assertEqual(output_tensor.shape, expected_shape)
 
+    def test_window_reused_across_calls(self):
+        input_tensor = self.create_mock_tensor((1, 16000))
+
+        # Apply STFT and inverse STFT, which should share a single window per device
+        stft_result = self.stft(input_tensor)
+        window = self.stft.get_window(input_tensor.device)
+        self.stft.inverse(stft_result)
+
+        # Check the window was only copied to the device once and matches the original Hann window
+        self.assertIs(self.stft.get_window(input_tensor.device), window)
+        self.assertEqual(len(self.stft.device_windows), 1)
+        self.assertTrue(torch.equal(window, self.stft.hann_window))
+
     @unittest.skipIf(not torch.backends.mps.is_available(), "MPS not available")
     def test_stft_with_mps_device(self):
         mps_device = torch.device("mps")
@@ -0,0 +1,50 @@
+import pytest
+import torch
+import torch.amp.autocast_mode as autocast_mode
+from audio_separator.separator.architectures.vr_separator import VRSeparator
+from audio_separator.separator.uvr_lib_v5.vr_network import nets_new
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return nets_new.CascadedNet(256, 56817, nout=16, nout_lstm=32).eval()
+
+
+@pytest.fixture
+def input_tensor():
+    return torch.rand(1, 2, 129, 256)
+
+
+def create_vr_separator(model, is_quantized):
+    # Skip __init__, which needs a model file on disk; predict_mask only uses the loaded network
+    separator = VRSeparator.__new__(VRSeparator)
+    separator.model_run = model
+    separator.is_quantized = is_quantized
+    return separator
+
+
+def test_quantized_predict_mask_under_autocast(model, input_tensor):
+    quantized_model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8)
+    separator = create_vr_separator(quantized_model, is_quantized=True)
+
+    # Run with autocast enabled in the same way Separator._separate_file does when use_autocast is set
+    with torch.no_grad(), autocast_mode.autocast("cpu"):
+        mask = separator.predict_mask(input_tensor)
+
+    with torch.no_grad():
+        expected_mask = model.predict_mask(input_tensor)
+
+    assert mask.dtype == torch.float32
+    assert mask.shape == expected_mask.shape
+    assert (mask - expected_mask).abs().max().item() < 0.05
+
+
+def test_unquantized_predict_mask_matches_model(model, input_tensor):
+    separator = create_vr_separator(model, is_quantized=False)
+
+    with torch.no_grad():
+        mask = separator.predict_mask(input_tensor)
+        expected_mask = model.predict_mask(input_tensor)
+
+    assert torch.equal(mask, expected_mask)